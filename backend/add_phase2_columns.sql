@@ -3,12 +3,13 @@
 
 \echo '📝 Adding Phase 2 columns to users table...'
 
-ALTER TABLE users ADD COLUMN IF NOT EXISTS email VARCHAR(200);
-ALTER TABLE users ADD COLUMN IF NOT EXISTS phone VARCHAR(50);
-ALTER TABLE users ADD COLUMN IF NOT EXISTS cv_url VARCHAR(500);
-ALTER TABLE users ADD COLUMN IF NOT EXISTS linkedin_url VARCHAR(500);
-ALTER TABLE users ADD COLUMN IF NOT EXISTS education_level VARCHAR(50);
-ALTER TABLE users ADD COLUMN IF NOT EXISTS years_experience INTEGER;
-ALTER TABLE users ADD COLUMN IF NOT EXISTS target_roles JSON;
+ALTER TABLE users
+    ADD COLUMN IF NOT EXISTS email VARCHAR(200),
+    ADD COLUMN IF NOT EXISTS phone VARCHAR(50),
+    ADD COLUMN IF NOT EXISTS cv_url VARCHAR(500),
+    ADD COLUMN IF NOT EXISTS linkedin_url VARCHAR(500),
+    ADD COLUMN IF NOT EXISTS education_level VARCHAR(50),
+    ADD COLUMN IF NOT EXISTS years_experience INTEGER,
+    ADD COLUMN IF NOT EXISTS target_roles JSON;
 
 \echo '✅ Phase 2 columns added successfully!'
@@ -1,10 +1,16 @@
-from pydantic_settings import BaseSettings
+from functools import lru_cache
+from pydantic_settings import BaseSettings, SettingsConfigDict
 from typing import Optional
 
 
 class Settings(BaseSettings):
     # Database
     DATABASE_URL: str
+    DB_POOL_SIZE: int = 20  # Persistent connections per worker
+    DB_MAX_OVERFLOW: int = 40  # Extra connections allowed under burst load
+    DB_POOL_RECYCLE_SECONDS: int = 1800  # Recycle connections before server-side idle timeouts
+    DB_STATEMENT_TIMEOUT_MS: int = 15000  # Abort runaway queries
+    WORKER_THREADS: int = 60  # Threads for sync routes; matches pool size + overflow
 
     # Pinecone
     PINECONE_API_KEY: str
@@ -22,6 +28,9 @@ class Settings(BaseSettings):
     # App Settings
     APP_NAME: str = "Quant Learning Platform"
     DEBUG: bool = True
+    MAX_UPLOAD_MB: int = 100  # Admin content uploads (PDF/markdown)
+    STATS_VIEW_REFRESH_SECONDS: int = 300  # Admin-stats materialized view refresh interval
+    CONTENT_HITS_FLUSH_SECONDS: int = 60  # How often cache hits are folded into access_count
 
     # JWT Authentication
     JWT_SECRET_KEY: str = "your-secret-key-change-in-production"  # Change in production!
@@ -37,9 +46,19 @@ class Settings(BaseSettings):
     CHUNK_OVERLAP: int = 128  # tokens (50% overlap for context preservation)
     TOKENIZER_MODEL: str = "cl100k_base"  # OpenAI's tiktoken encoding
 
-    class Config:
-        env_file = ".env"
-        case_sensitive = True
+    # Frozen: settings are read-only after startup; unknown .env keys are ignored
+    model_config = SettingsConfigDict(
+        env_file=".env",
+        case_sensitive=True,
+        frozen=True,
+        extra="ignore"
+    )
 
 
-settings = Settings()
+@lru_cache(maxsize=1)
+def get_settings() -> Settings:
+    """Build Settings once per process (usable as a FastAPI dependency)"""
+    return Settings()
+
+
+settings = get_settings()
@@ -1,15 +1,66 @@
+import asyncio
+import logging
+import anyio.to_thread
+import sys
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
 from app.config.settings import settings
-from app.models.database import init_db
+from app.models.database import init_db_if_needed, refresh_stats_views, flush_content_hits
 from app.routes import nodes, content, progress, users, admin, insights, auth
 import uvicorn
 
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s %(levelname)s %(message)s",
+    stream=sys.stderr
+)
+logger = logging.getLogger(__name__)
+
+
+async def _run_periodically(func, interval_seconds: int, label: str):
+    """Run a blocking maintenance job in the threadpool every interval"""
+    while True:
+        await asyncio.sleep(interval_seconds)
+        try:
+            await run_in_threadpool(func)
+        except Exception as e:
+            logger.warning("%s failed: %s", label, e)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Initialize database on startup (skipped when the schema is unchanged)"""
+    # Sync routes each hold a worker thread through their DB/LLM round trips;
+    # size the threadpool to the connection pool instead of anyio's default 40
+    anyio.to_thread.current_default_thread_limiter().total_tokens = settings.WORKER_THREADS
+    logger.info("Checking database schema...")
+    if await run_in_threadpool(init_db_if_needed):
+        logger.info("Database initialized successfully!")
+    else:
+        logger.info("Database schema up to date, skipping table creation")
+    logger.info("Server starting at http://localhost:8000")
+    logger.info("API docs available at http://localhost:8000/docs")
+    background_tasks = [
+        asyncio.create_task(_run_periodically(
+            refresh_stats_views, settings.STATS_VIEW_REFRESH_SECONDS, "Stats view refresh"
+        )),
+        asyncio.create_task(_run_periodically(
+            flush_content_hits, settings.CONTENT_HITS_FLUSH_SECONDS, "Content hits flush"
+        )),
+    ]
+    yield
+    for task in background_tasks:
+        task.cancel()
+
+
 # Initialize FastAPI app
 app = FastAPI(
     title=settings.APP_NAME,
     description="Interactive mind-map driven learning platform for aspiring quant researchers",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # Configure CORS
@@ -19,8 +70,10 @@ app.add_middleware(
     CORSMiddleware,
     allow_origins=allowed_origins,
     allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
+    # Explicit lists (no "*" echoing) and a one-day preflight cache
+    allow_methods=["GET", "POST", "PUT", "PATCH", "DELETE"],
+    allow_headers=["Authorization", "Content-Type", "If-None-Match", "X-Admin-Token"],
+    max_age=86400,
 )
 
 # Include routers
@@ -33,16 +86,6 @@ app.include_router(admin.router)
 app.include_router(insights.router)
 
 
-@app.on_event("startup")
-async def startup_event():
-    """Initialize database on startup"""
-    print("Initializing database...")
-    init_db()
-    print("Database initialized successfully!")
-    print(f"Server starting at http://localhost:8000")
-    print(f"API docs available at http://localhost:8000/docs")
-
-
 @app.get("/")
 def root():
     """Root endpoint with API information"""
@@ -1,17 +1,51 @@
 """
 Authentication middleware for JWT validation and role-based access control
 """
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Request, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlalchemy.orm import Session
-from jose import JWTError, jwt
+import hashlib
+import time
+import jwt
+from jwt import InvalidTokenError
 from typing import Optional
 from functools import wraps
+from types import SimpleNamespace
 
 from app.models.database import User, get_db
 from app.config.settings import settings
+from app.utils.ttl_cache import TTLCache
 
 security = HTTPBearer()
+optional_security = HTTPBearer(auto_error=False)
+
+# Built once instead of on every jwt.decode call
+_JWT_KEY = settings.JWT_SECRET_KEY.encode()
+_JWT_ALGORITHMS = [settings.JWT_ALGORITHM]
+_JWT_OPTIONS = {"require": ["exp", "sub"]}
+
+# Decoded payloads keyed by token digest, so a burst of requests with the
+# same bearer token skips re-verifying the signature
+_TOKEN_CACHE = TTLCache(maxsize=10_000, ttl=30)
+
+# Short-lived cache of detached User rows keyed by user_id (JWT "sub")
+_USER_CACHE = TTLCache(maxsize=10_000, ttl=60)
+
+
+def _load_user(db: Session, user_id: str) -> Optional[User]:
+    """Fetch a user through the TTL cache, detaching it from the session"""
+    user = _USER_CACHE.get(user_id)
+    if user is None:
+        user = db.query(User).filter(User.user_id == user_id).first()
+        if user is not None:
+            db.expunge(user)
+            _USER_CACHE.set(user_id, user)
+    return user
+
+
+def invalidate_cached_user(user_id: str) -> None:
+    """Drop a cached user after its row changes (role, name, profile...)"""
+    _USER_CACHE.pop(user_id, None)
 
 
 def decode_token(token: str) -> dict:
@@ -19,14 +53,21 @@ def decode_token(token: str) -> dict:
     Decode and validate JWT token
     Returns payload dict with user_id (sub) and role
     """
+    cache_key = hashlib.blake2b(token.encode(), digest_size=16).digest()
+    payload = _TOKEN_CACHE.get(cache_key)
+    if payload is not None and payload["exp"] > time.time():
+        return payload
+
     try:
         payload = jwt.decode(
             token,
-            settings.JWT_SECRET_KEY,
-            algorithms=[settings.JWT_ALGORITHM]
+            _JWT_KEY,
+            algorithms=_JWT_ALGORITHMS,
+            options=_JWT_OPTIONS
         )
+        _TOKEN_CACHE.set(cache_key, payload)
         return payload
-    except JWTError:
+    except InvalidTokenError:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Could not validate credentials",
@@ -34,21 +75,13 @@ def decode_token(token: str) -> dict:
         )
 
 
-async def get_current_user(
-    credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: Session = Depends(get_db)
-) -> User:
-    """
-    Dependency to get current authenticated user from JWT token
+def _identity(user_id: str, role: str, name: Optional[str] = None) -> SimpleNamespace:
+    """Lightweight user-shaped object carrying just identity and role"""
+    return SimpleNamespace(user_id=user_id, role=role, name=name)
 
-    Usage in routes:
-        @router.get("/protected")
-        async def protected_route(current_user: User = Depends(get_current_user)):
-            return {"user_id": current_user.user_id, "role": current_user.role}
-    """
-    token = credentials.credentials
-    payload = decode_token(token)
 
+def _user_from_payload(request: Request, payload: dict, db: Session) -> User:
+    """Resolve the ORM User for a decoded token (TTL-cached, memoized per request)"""
     user_id: str = payload.get("sub")
     if user_id is None:
         raise HTTPException(
@@ -57,8 +90,8 @@ async def get_current_user(
             headers={"WWW-Authenticate": "Bearer"}
         )
 
-    # Fetch user from database
-    user = db.query(User).filter(User.user_id == user_id).first()
+    # Fetch user (TTL-cached to skip the SELECT on hot paths)
+    user = _load_user(db, user_id)
     if user is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -66,20 +99,71 @@ async def get_current_user(
             headers={"WWW-Authenticate": "Bearer"}
         )
 
+    request.state.user = user
     return user
 
 
+async def get_current_user(
+    request: Request,
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    db: Session = Depends(get_db)
+) -> SimpleNamespace:
+    """
+    Dependency to get current authenticated user from JWT token
+
+    Usage in routes:
+        @router.get("/protected")
+        async def protected_route(current_user = Depends(get_current_user)):
+            return {"user_id": current_user.user_id, "role": current_user.role}
+
+    Returns user_id, role and name from the user row rather than the token's
+    role claim, so a demotion or deletion revokes access within the 60s user
+    cache TTL (immediately on the worker that made the change) instead of
+    only at token expiry. Hot paths still skip the SELECT via that cache.
+    Use get_current_user_full when the ORM User row is needed.
+    """
+    identity = getattr(request.state, "identity", None)
+    if identity is not None:
+        return identity
+
+    user = _user_from_payload(request, decode_token(credentials.credentials), db)
+    identity = _identity(user.user_id, user.role, user.name)
+
+    request.state.identity = identity
+    return identity
+
+
+async def get_current_user_full(
+    request: Request,
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    db: Session = Depends(get_db)
+) -> User:
+    """
+    Dependency to get the current user's full ORM row from the database
+
+    The resolved user is memoized on request.state so other dependencies
+    in the same request reuse it. It is detached from the session (shared
+    via a TTL cache), so call db.merge(current_user) before modifying it.
+    """
+    cached_user = getattr(request.state, "user", None)
+    if cached_user is not None:
+        return cached_user
+
+    return _user_from_payload(request, decode_token(credentials.credentials), db)
+
+
 async def get_current_user_optional(
-    credentials: Optional[HTTPAuthorizationCredentials] = Depends(HTTPBearer(auto_error=False)),
+    request: Request,
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(optional_security),
     db: Session = Depends(get_db)
-) -> Optional[User]:
+) -> Optional[SimpleNamespace]:
     """
     Optional authentication - returns None if no token provided
     Useful for routes that work both authenticated and unauthenticated
 
     Usage:
         @router.get("/public-or-private")
-        async def route(user: Optional[User] = Depends(get_current_user_optional)):
+        async def route(user = Depends(get_current_user_optional)):
             if user:
                 return {"message": f"Hello {user.name}"}
             return {"message": "Hello guest"}
@@ -87,18 +171,28 @@ async def get_current_user_optional(
     if credentials is None:
         return None
 
-    try:
-        token = credentials.credentials
-        payload = decode_token(token)
-        user_id: str = payload.get("sub")
+    identity = getattr(request.state, "identity", None)
+    if identity is not None:
+        return identity
 
-        if user_id:
-            user = db.query(User).filter(User.user_id == user_id).first()
-            return user
+    try:
+        payload = decode_token(credentials.credentials)
     except HTTPException:
-        pass
+        return None
 
-    return None
+    user_id: str = payload.get("sub")
+    if not user_id:
+        return None
+
+    # Role comes from the cached row, as in get_current_user
+    user = _load_user(db, user_id)
+    if user is None:
+        return None
+    request.state.user = user
+    identity = _identity(user.user_id, user.role, user.name)
+
+    request.state.identity = identity
+    return identity
 
 
 class RoleChecker:
@@ -114,13 +208,14 @@ class RoleChecker:
             return {"message": "Admin access granted"}
     """
     def __init__(self, allowed_roles: list[str]):
-        self.allowed_roles = allowed_roles
+        self.allowed_roles = frozenset(allowed_roles)
+        self._forbidden_msg = f"Access forbidden. Required roles: {', '.join(allowed_roles)}"
 
-    async def __call__(self, current_user: User = Depends(get_current_user)) -> User:
+    async def __call__(self, current_user: SimpleNamespace = Depends(get_current_user)) -> SimpleNamespace:
         if current_user.role not in self.allowed_roles:
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
-                detail=f"Access forbidden. Required roles: {', '.join(self.allowed_roles)}"
+                detail=self._forbidden_msg
             )
         return current_user
 
@@ -144,13 +239,16 @@ def require_role(*roles: str):
 
     Note: The route function must have current_user parameter with Depends(get_current_user)
     """
+    roles_set = frozenset(roles)
+    forbidden_msg = f"Access forbidden. Required roles: {', '.join(roles)}"
+
     def decorator(func):
         @wraps(func)
-        async def wrapper(*args, current_user: User, **kwargs):
-            if current_user.role not in roles:
+        async def wrapper(*args, current_user: SimpleNamespace, **kwargs):
+            if current_user.role not in roles_set:
                 raise HTTPException(
                     status_code=status.HTTP_403_FORBIDDEN,
-                    detail=f"Access forbidden. Required roles: {', '.join(roles)}"
+                    detail=forbidden_msg
                 )
             return await func(*args, current_user=current_user, **kwargs)
         return wrapper
@@ -1,11 +1,40 @@
-from sqlalchemy import create_engine, Column, Integer, String, Text, Float, ForeignKey, Table, JSON, DateTime, Boolean, Date
+from sqlalchemy import bindparam, create_engine, event, cast, func, CheckConstraint, Column, BigInteger, Integer, String, Text, Float, ForeignKey, Table, JSON, DateTime, Boolean, Date, Index, MetaData, select, text
+from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, relationship
+from sqlalchemy.dialects.postgresql import ARRAY, JSONB, insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.expression import FunctionElement
+import hashlib
 from datetime import datetime
+from typing import Optional
 from app.config.settings import settings
 
 Base = declarative_base()
 
+# Binary JSONB on PostgreSQL (no re-parse on read); plain JSON elsewhere (SQLite fallback)
+JSONType = JSON().with_variant(JSONB(), 'postgresql')
+IntArrayType = JSON().with_variant(ARRAY(Integer), 'postgresql')
+StringArrayType = JSON().with_variant(ARRAY(String(100)), 'postgresql')
+
+
+class utcnow(FunctionElement):
+    """Server-side UTC timestamp (naive, matching the datetime.utcnow() values used in queries)"""
+    type = DateTime()
+    inherit_cache = True
+
+
+@compiles(utcnow, 'postgresql')
+def _pg_utcnow(element, compiler, **kw):
+    return "TIMEZONE('utc', CURRENT_TIMESTAMP)"
+
+
+@compiles(utcnow)
+def _default_utcnow(element, compiler, **kw):
+    return "CURRENT_TIMESTAMP"  # UTC on SQLite
+
+
 # Association table for node relationships (edges)
 node_edges = Table(
     'node_edges',
@@ -16,6 +45,26 @@ node_edges = Table(
 )
 
 
+def bulk_add_edges(db, pairs, edge_type='prerequisite'):
+    """
+    Insert (parent_id, child_id) edges with a single INSERT, skipping existing ones
+
+    Use instead of appending to Node.parents/children in a loop, which
+    flushes one INSERT per edge.
+    """
+    rows = [
+        {"parent_id": parent_id, "child_id": child_id, "edge_type": edge_type}
+        for parent_id, child_id in pairs
+    ]
+    if not rows:
+        return
+    dialect_insert = pg_insert if db.get_bind().dialect.name == 'postgresql' else sqlite_insert
+    db.execute(
+        dialect_insert(node_edges).values(rows)
+        .on_conflict_do_nothing(index_elements=['parent_id', 'child_id'])
+    )
+
+
 class Node(Base):
     """Represents a topic/concept node in the mind map"""
     __tablename__ = 'nodes'
@@ -33,75 +82,36 @@ class Node(Base):
     color = Column(String(20))  # Hex color for the node
     icon = Column(String(50))  # Emoji or icon name
     content_path = Column(String(500))  # Path to markdown file
-    extra_metadata = Column(JSON)  # Additional flexible metadata
+    extra_metadata = Column(JSONType)  # Additional flexible metadata
+
+    # Learning path placement (real columns so they can be filtered/sorted in SQL)
+    learning_path = Column(String(100), index=True)
+    sequence_order = Column(Integer, index=True)  # Order within the learning path
+    prerequisites_ids = Column(IntArrayType, default=list)  # Prerequisite node IDs
+    tags = Column(StringArrayType, default=list)  # Topic tags
 
     # Relationships
+    # Lazy by default so single-node lookups (content, progress) don't pay for
+    # the edges; listings opt in with selectinload(Node.children/parents)
     children = relationship(
         'Node',
         secondary=node_edges,
         primaryjoin=id == node_edges.c.parent_id,
         secondaryjoin=id == node_edges.c.child_id,
-        backref='parents'
+        lazy='select',
+        back_populates='parents'
+    )
+    parents = relationship(
+        'Node',
+        secondary=node_edges,
+        primaryjoin=id == node_edges.c.child_id,
+        secondaryjoin=id == node_edges.c.parent_id,
+        lazy='select',
+        back_populates='children'
     )
 
     content_chunks = relationship('ContentChunk', back_populates='node', cascade='all, delete-orphan')
-
-    # Learning path helper properties (stored in extra_metadata)
-    @property
-    def learning_path(self):
-        """Get learning path from metadata"""
-        if not self.extra_metadata:
-            return None
-        return self.extra_metadata.get('learning_path')
-
-    @learning_path.setter
-    def learning_path(self, value):
-        """Set learning path in metadata"""
-        if not self.extra_metadata:
-            self.extra_metadata = {}
-        self.extra_metadata['learning_path'] = value
-
-    @property
-    def sequence_order(self):
-        """Get sequence order within learning path"""
-        if not self.extra_metadata:
-            return None
-        return self.extra_metadata.get('sequence_order')
-
-    @sequence_order.setter
-    def sequence_order(self, value):
-        """Set sequence order in metadata"""
-        if not self.extra_metadata:
-            self.extra_metadata = {}
-        self.extra_metadata['sequence_order'] = value
-
-    @property
-    def prerequisites_ids(self):
-        """Get list of prerequisite node IDs"""
-        if not self.extra_metadata:
-            return []
-        return self.extra_metadata.get('prerequisites_ids', [])
-
-    @prerequisites_ids.setter
-    def prerequisites_ids(self, value):
-        """Set prerequisite node IDs"""
-        if not self.extra_metadata:
-            self.extra_metadata = {}
-        self.extra_metadata['prerequisites_ids'] = value if value else []
-
-    @property
-    def tags(self):
-        """Get topic tags"""
-        if not self.extra_metadata:
-            return []
-        return self.extra_metadata.get('tags', [])
-
-    @tags.setter
-    def tags(self, value):
-        """Set topic tags"""
-        if not self.extra_metadata:
-            self.extra_metadata = {}
-        self.extra_metadata['tags'] = value if value else []
+    insights = relationship('TopicInsights', back_populates='node')
 
 
 class ContentChunk(Base):
@@ -113,7 +123,7 @@ class ContentChunk(Base):
     chunk_text = Column(Text, nullable=False)
     chunk_index = Column(Integer)  # Order within the document
     vector_id = Column(String(100), unique=True)  # Pinecone vector ID
-    extra_metadata = Column(JSON)  # chunk_type: explanation, example, formula, etc.
+    extra_metadata = Column(JSONType)  # chunk_type: explanation, example, formula, etc.
 
     node = relationship('Node', back_populates='content_chunks')
 
@@ -129,9 +139,9 @@ class User(Base):
     role = Column(String(50), default='candidate')  # 'candidate', 'recruiter', 'admin'
     learning_level = Column(Integer, default=3)  # DEPRECATED: Keep for backward compat with scripts
     background = Column(Text)  # DEPRECATED: Replaced by job_description
-    preferences = Column(JSON)  # Custom preferences
-    created_at = Column(DateTime, default=datetime.utcnow)
-    last_active = Column(DateTime, default=datetime.utcnow)
+    preferences = Column(JSONType)  # Custom preferences
+    created_at = Column(DateTime, server_default=utcnow())
+    last_active = Column(DateTime, server_default=utcnow(), index=True)  # Active-users stat
 
     # Phase 2: Professional Profile Fields
     email = Column(String(200))
@@ -141,7 +151,7 @@ class User(Base):
     education_level = Column(String(50))  # 'undergraduate', 'masters', 'phd', 'postdoc'
     job_role = Column(String(200))  # Current job title/role
     years_experience = Column(Integer)  # Years of professional experience
-    target_roles = Column(JSON)  # Array of target roles: ["quant researcher", "quant trader", etc.]
+    target_roles = Column(JSONType)  # Array of target roles: ["quant researcher", "quant trader", etc.]
 
     # Job-Based Personalization Fields (Phase 2.5)
     job_title = Column(String(200))  # e.g., "Quantitative Researcher"
@@ -149,6 +159,7 @@ class User(Base):
     job_seniority = Column(String(50))  # 'junior', 'mid', 'senior', 'not_specified'
     firm = Column(String(200))  # e.g., "Citadel", "Two Sigma" (optional)
     job_role_type = Column(String(100))  # 'quant_researcher', 'quant_trader', 'risk_quant', 'ml_engineer'
+    job_profile_hash = Column(String(16))  # Cache key for custom jobs, set whenever job_description is
 
     # Candidate-specific fields (nullable)
     cv_text = Column(Text, nullable=True)
@@ -161,12 +172,15 @@ class User(Base):
     company_url = Column(String(500), nullable=True)
     recruiter_type = Column(String(50), nullable=True)  # 'internal', 'agency', 'headhunter'
 
+    # Denormalized from the profile fields on every insert/update (see listener below)
+    profile_completion_percent = Column(Integer, default=0)
+
     progress = relationship('UserProgress', back_populates='user')
     competencies = relationship('UserCompetency', back_populates='user', cascade='all, delete-orphan')
     study_sessions = relationship('StudySession', back_populates='user', cascade='all, delete-orphan')
+    learning_paths = relationship('LearningPath', back_populates='user')
 
-    @property
-    def profile_completion_percent(self):
+    def compute_profile_completion(self) -> int:
         """Calculate profile completion percentage"""
         total_fields = 4  # name, email, education_level, job_description
         completed = 0
@@ -195,6 +209,22 @@ class User(Base):
         return min(base_percent + bonus, 100)
 
 
+@event.listens_for(User, 'before_insert')
+@event.listens_for(User, 'before_update')
+def _refresh_profile_completion(mapper, connection, target):
+    target.profile_completion_percent = target.compute_profile_completion()
+
+
+def job_description_hash(job_description: str) -> str:
+    """Cache key for content generated against a custom job description"""
+    return hashlib.md5(job_description.encode()).hexdigest()[:16]
+
+
+@event.listens_for(User.job_description, 'set')
+def _refresh_job_profile_hash(target, value, oldvalue, initiator):
+    target.job_profile_hash = job_description_hash(value) if value else None
+
+
 class UserProgress(Base):
     """Track user learning progress"""
     __tablename__ = 'user_progress'
@@ -205,36 +235,166 @@ class UserProgress(Base):
     completed = Column(Integer, default=0)  # 0-100 percentage
     quiz_score = Column(Float)
     time_spent_minutes = Column(Integer, default=0)
-    last_accessed = Column(DateTime, default=datetime.utcnow)
-    extra_metadata = Column(JSON)
+    last_accessed = Column(DateTime, server_default=utcnow())
+    extra_metadata = Column(JSONType)
 
     user = relationship('User', back_populates='progress')
     node = relationship('Node')
 
+    __table_args__ = (
+        Index('ix_userprogress_user_node', 'user_id', 'node_id'),  # Per (user, node) progress lookups
+        # Progress listing / recent activity per user, answerable from the index alone
+        Index('ix_userprogress_user_last', user_id, last_accessed.desc(),
+              postgresql_include=['node_id', 'completed', 'quiz_score', 'time_spent_minutes']),
+    )
+
 
 class GeneratedContent(Base):
-    """Cache for LLM-generated content"""
+    """
+    Cache for LLM-generated content (lookup keys and counters)
+
+    The large payload lives in GeneratedContentBody so cache lookups and
+    stats aggregations scan a narrow table; load it explicitly via `body`.
+    """
     __tablename__ = 'generated_content'
 
     id = Column(Integer, primary_key=True, index=True)
     node_id = Column(Integer, ForeignKey('nodes.id'), nullable=False, index=True)
-    content_type = Column(String(50), nullable=False, index=True)  # explanation, example, quiz, visualization
-    difficulty_level = Column(Integer, index=True)  # DEPRECATED: Keep for backward compat, nullable now
-    generated_content = Column(Text, nullable=False)
-    interactive_component = Column(JSON)  # For quizzes, visualizations, etc.
-    source_chunks = Column(JSON)  # Track which chunks were used
-    related_topics = Column(JSON)  # Suggested related topics
+    content_type = Column(String(50), nullable=False)  # explanation, example, quiz, visualization
+    difficulty_level = Column(Integer)  # DEPRECATED: Keep for backward compat, nullable now
     content_version = Column(Integer, default=1)  # For cache invalidation
-    created_at = Column(DateTime, default=datetime.utcnow, index=True)
+    created_at = Column(DateTime, server_default=utcnow(), index=True)
     access_count = Column(Integer, default=0)  # Track usage
     rating = Column(Float)  # Student feedback rating
     is_valid = Column(Boolean, default=True)  # For cache invalidation
 
     # Job-Based Cache Keys (Phase 2.5)
-    role_template_id = Column(String(50), index=True)  # For common roles: 'quant_researcher', 'quant_trader'
-    job_profile_hash = Column(String(32), index=True)  # MD5 hash of custom job description
+    role_template_id = Column(String(50))  # For common roles: 'quant_researcher', 'quant_trader'
+    job_profile_hash = Column(String(32))  # MD5 hash of custom job description
 
     node = relationship('Node')
+    body = relationship(
+        'GeneratedContentBody',
+        uselist=False,
+        lazy='raise',
+        cascade='all, delete-orphan',
+        passive_deletes=True
+    )
+
+    __table_args__ = (
+        # Cache lookups in query_content only ever match valid rows, so the three
+        # lookup indexes are partial on is_valid (difficulty, template role, job hash)
+        Index('ix_gc_difficulty_lookup', 'node_id', 'content_type', 'difficulty_level', 'content_version',
+              postgresql_where=is_valid == True),
+        Index('ix_gc_role_lookup_valid', 'node_id', 'content_type', 'role_template_id', 'content_version',
+              postgresql_where=role_template_id.isnot(None) & (is_valid == True)),
+        Index('ix_gc_hash_lookup_valid', 'node_id', 'content_type', 'job_profile_hash', 'content_version',
+              postgresql_where=job_profile_hash.isnot(None) & (is_valid == True)),
+        Index('ix_gc_valid_created', 'is_valid', 'created_at'),
+        # Admin stats: access totals per content type, ratings per difficulty
+        Index('ix_gc_type_access', 'content_type', 'access_count'),
+        Index('ix_gc_rating_diff', 'difficulty_level', 'rating',
+              postgresql_where=rating.isnot(None)),
+        # Admin feedback: newest rated rows first
+        Index('ix_gc_rated_created', created_at.desc(),
+              postgresql_where=rating.isnot(None)),
+        # A cached row is keyed by a role template or a job hash, never both
+        CheckConstraint('role_template_id IS NULL OR job_profile_hash IS NULL',
+                        name='ck_gc_single_job_key'),
+        # At most one valid row per cache key, so concurrent generations dedupe on insert
+        Index('ux_gc_cache_key', node_id, content_type,
+              func.coalesce(role_template_id, job_profile_hash, cast(difficulty_level, String)),
+              content_version, unique=True,
+              postgresql_where=is_valid == True, sqlite_where=is_valid == True),
+    )
+
+
+class GeneratedContentBody(Base):
+    """Payload of a GeneratedContent row (1:1, same id)"""
+    __tablename__ = 'generated_content_bodies'
+
+    id = Column(Integer, ForeignKey('generated_content.id', ondelete='CASCADE'), primary_key=True)
+    generated_content = Column(Text, nullable=False)
+    interactive_component = Column(JSONType)  # For quizzes, visualizations, etc.
+    source_chunks = Column(JSONType)  # Track which chunks were used
+    related_topics = Column(JSONType)  # Suggested related topics
+    response_json = Column(Text)  # Serialized QueryResponse, served as-is on cache hits
+
+
+class ContentHit(Base):
+    """
+    Append-only log of GeneratedContent cache hits
+
+    Cache hits insert here instead of updating generated_content.access_count
+    (no row contention on hot content); flush_content_hits() folds them into
+    access_count periodically. No FK so inserts never lock the content row.
+    """
+    __tablename__ = 'content_hits'
+
+    id = Column(Integer, primary_key=True)
+    content_id = Column(Integer, nullable=False)
+    created_at = Column(DateTime, server_default=utcnow())
+
+
+class PlatformStat(Base):
+    """
+    Precomputed platform counters read by the admin stats (key -> value)
+
+    gen_count and gen_queries_total track generated_content row count and
+    SUM(access_count), maintained on write instead of aggregated on read.
+    """
+    __tablename__ = 'platform_stats'
+
+    key = Column(String(50), primary_key=True)
+    value = Column(BigInteger, nullable=False, default=0)
+
+
+def bump_platform_stat(conn, key: str, delta: int = 1):
+    """Atomically add delta to a platform counter, creating it if missing"""
+    dialect_insert = pg_insert if conn.dialect.name == 'postgresql' else sqlite_insert
+    stmt = dialect_insert(PlatformStat.__table__).values(key=key, value=delta)
+    conn.execute(stmt.on_conflict_do_update(
+        index_elements=['key'],
+        set_={'value': PlatformStat.__table__.c.value + delta}
+    ))
+
+
+@event.listens_for(GeneratedContent, 'after_insert')
+def _count_generated_content_insert(mapper, connection, target):
+    bump_platform_stat(connection, 'gen_count', 1)
+    bump_platform_stat(connection, 'gen_queries_total', target.access_count or 0)
+
+
+@event.listens_for(GeneratedContent, 'after_delete')
+def _count_generated_content_delete(mapper, connection, target):
+    bump_platform_stat(connection, 'gen_count', -1)
+    bump_platform_stat(connection, 'gen_queries_total', -(target.access_count or 0))
+
+
+def insert_generated_content(db, body: dict, **values) -> Optional[int]:
+    """
+    Insert a cache row and its body unless a valid row with the same key exists
+
+    INSERT ... ON CONFLICT DO NOTHING against ux_gc_cache_key lets concurrent
+    generations of the same content dedupe in the database. Returns the new
+    id, or None if another request already cached it. Core inserts skip the
+    ORM events, so the platform counters are bumped here.
+    """
+    dialect_insert = pg_insert if db.get_bind().dialect.name == 'postgresql' else sqlite_insert
+    content_table = GeneratedContent.__table__
+    content_id = db.execute(
+        dialect_insert(content_table).values(**values)
+        .on_conflict_do_nothing()
+        .returning(content_table.c.id)
+    ).scalar()
+    if content_id is None:
+        return None
+
+    db.execute(GeneratedContentBody.__table__.insert().values(id=content_id, **body))
+    conn = db.connection()
+    bump_platform_stat(conn, 'gen_count', 1)
+    bump_platform_stat(conn, 'gen_queries_total', values.get('access_count') or 0)
+    return content_id
 
 
 class TopicInsights(Base):
@@ -255,10 +415,10 @@ class TopicInsights(Base):
     bibliographic_notes = Column(Text)
     discussion_sections = Column(JSON)  # Array of discussion text
 
-    created_at = Column(DateTime, default=datetime.utcnow)
-    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    created_at = Column(DateTime, server_default=utcnow())
+    updated_at = Column(DateTime, server_default=utcnow(), onupdate=utcnow())
 
-    node = relationship('Node', backref='insights')
+    node = relationship('Node', back_populates='insights')
 
 
 class UserCompetency(Base):
@@ -271,7 +431,7 @@ class UserCompetency(Base):
     topics_completed = Column(Integer, default=0)  # Number of topics completed in this category
     topics_total = Column(Integer, default=0)  # Total topics in this category at user's level
     level = Column(String(50))  # 'beginner', 'intermediate', 'advanced'
-    last_updated = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    last_updated = Column(DateTime, server_default=utcnow(), onupdate=utcnow())
 
     user = relationship('User', back_populates='competencies')
 
@@ -302,7 +462,7 @@ class StudySession(Base):
     user_id = Column(String(100), ForeignKey('users.user_id'), index=True)
     node_id = Column(Integer, ForeignKey('nodes.id'))
     duration_seconds = Column(Integer, default=0)  # Time spent in seconds
-    completed_at = Column(DateTime, default=datetime.utcnow, index=True)
+    completed_at = Column(DateTime, server_default=utcnow(), index=True)
 
     user = relationship('User', back_populates='study_sessions')
     node = relationship('Node')
@@ -326,10 +486,55 @@ class LearningPath(Base):
     uncovered_topics = Column(JSON)  # Topics not in books: [{"topic": "...", "external_resources": [...]}]
     coverage_percentage = Column(Integer)  # 0-100: % of job requirements covered by our books
 
-    created_at = Column(DateTime, default=datetime.utcnow)
-    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    created_at = Column(DateTime, server_default=utcnow())
+    updated_at = Column(DateTime, server_default=utcnow(), onupdate=utcnow())
+
+    user = relationship('User', back_populates='learning_paths')
+
+    __table_args__ = (
+        # Latest path per user and the generation rate-limit probe
+        Index('ix_learningpath_user_created', user_id, created_at.desc()),
+    )
+
 
-    user = relationship('User', backref='learning_paths')
+class PathGenerationClaim(Base):
+    """
+    A user's learning-path generation slot, shared by every worker
+
+    A row whose expires_at is still ahead means the user started a generation
+    within the rate-limit window. Taken with claim_path_generation (the SQL
+    form of SET NX EX); failed generations and admin resets delete it.
+    """
+    __tablename__ = 'path_generation_claims'
+
+    user_id = Column(String(100), ForeignKey('users.user_id', ondelete='CASCADE'), primary_key=True)
+    expires_at = Column(DateTime, nullable=False)
+
+
+def claim_path_generation(db, user_id: str, now: datetime, expires_at: datetime) -> bool:
+    """
+    Claim a user's generation slot until expires_at unless a live claim holds it
+
+    One INSERT ... ON CONFLICT DO UPDATE that only overwrites an expired row,
+    so concurrent requests on any worker get exactly one True.
+    """
+    dialect_insert = pg_insert if db.get_bind().dialect.name == 'postgresql' else sqlite_insert
+    claims = PathGenerationClaim.__table__
+    stmt = dialect_insert(claims).values(user_id=user_id, expires_at=expires_at)
+    claimed = db.execute(
+        stmt.on_conflict_do_update(
+            index_elements=['user_id'],
+            set_={'expires_at': stmt.excluded.expires_at},
+            where=claims.c.expires_at <= now
+        ).returning(claims.c.user_id)
+    ).scalar()
+    return claimed is not None
+
+
+def release_path_generation(db, user_id: str):
+    """Drop a user's generation claim so they can generate again"""
+    claims = PathGenerationClaim.__table__
+    db.execute(claims.delete().where(claims.c.user_id == user_id))
 
 
 class TopicStructure(Base):
@@ -355,8 +560,8 @@ class TopicStructure(Base):
     access_count = Column(Integer, default=0)  # Track usage
     is_valid = Column(Boolean, default=True)  # For cache invalidation
 
-    created_at = Column(DateTime, default=datetime.utcnow, index=True)
-    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    created_at = Column(DateTime, server_default=utcnow(), index=True)
+    updated_at = Column(DateTime, server_default=utcnow(), onupdate=utcnow())
 
 
 class SectionContent(Base):
@@ -383,18 +588,193 @@ class SectionContent(Base):
     access_count = Column(Integer, default=0)  # Track usage
     is_valid = Column(Boolean, default=True)  # For cache invalidation
 
-    created_at = Column(DateTime, default=datetime.utcnow, index=True)
-    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    created_at = Column(DateTime, server_default=utcnow(), index=True)
+    updated_at = Column(DateTime, server_default=utcnow(), onupdate=utcnow())
+
+    __table_args__ = (
+        # Covers the per-topic access_count aggregation in the admin stats
+        Index('ix_section_topic_access', 'topic_name', 'access_count'),
+    )
 
 
 # Database setup
-engine = create_engine(settings.DATABASE_URL)
+# Bulk inserts (add_all, executemany) go out as multi-row INSERT ... VALUES pages;
+# psycopg2 additionally batches UPDATE/DELETE executemany calls
+_dialect_kwargs = {"insertmanyvalues_page_size": 1000}
+if settings.DATABASE_URL.startswith(("postgresql://", "postgresql+psycopg2://")):
+    _dialect_kwargs["executemany_mode"] = "values_plus_batch"
+    # libpq connection parameters; other drivers (e.g. sqlite3) reject them
+    _dialect_kwargs["connect_args"] = {
+        "application_name": "quant_learn",
+        "options": f"-c statement_timeout={settings.DB_STATEMENT_TIMEOUT_MS}"
+    }
+
+# LIFO keeps a small set of warm connections busy; pre-ping drops stale ones after a DB restart.
+# The compiled-statement cache is sized above the 500 default so every route's
+# statement shapes (including per-IN-list-length variants) stay compiled.
+engine = create_engine(
+    settings.DATABASE_URL,
+    query_cache_size=1200,
+    pool_size=settings.DB_POOL_SIZE,
+    max_overflow=settings.DB_MAX_OVERFLOW,
+    pool_pre_ping=True,
+    pool_recycle=settings.DB_POOL_RECYCLE_SECONDS,
+    pool_use_lifo=True,
+    **_dialect_kwargs
+)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 
+# Admin-stats aggregates precomputed as materialized views (PostgreSQL only):
+# name -> (query, unique key column required by REFRESH ... CONCURRENTLY)
+STATS_VIEWS = {
+    'mv_top_topics': (
+        "SELECT ROW_NUMBER() OVER (ORDER BY SUM(access_count) DESC) AS node_id, "
+        "topic_name AS title, SUM(access_count) AS access_count "
+        "FROM section_contents GROUP BY topic_name ORDER BY node_id LIMIT 10",
+        'node_id',
+    ),
+    'mv_content_type_stats': (
+        "SELECT content_type, SUM(access_count) AS count "
+        "FROM generated_content GROUP BY content_type",
+        'content_type',
+    ),
+}
+
+
+def create_stats_views(conn):
+    """Create the admin-stats materialized views if missing"""
+    for name, (query, key) in STATS_VIEWS.items():
+        conn.execute(text(f"CREATE MATERIALIZED VIEW IF NOT EXISTS {name} AS {query}"))
+        conn.execute(text(f"CREATE UNIQUE INDEX IF NOT EXISTS ux_{name} ON {name} ({key})"))
+
+
+def refresh_stats_views():
+    """Recompute the admin-stats materialized views without blocking readers"""
+    if engine.dialect.name != 'postgresql':
+        return
+    with engine.begin() as conn:
+        for name in STATS_VIEWS:
+            conn.execute(text(f"REFRESH MATERIALIZED VIEW CONCURRENTLY {name}"))
+
+
+def log_content_hit(content_id: int):
+    """Append one cache hit in its own short transaction (run after the response is sent)"""
+    with engine.begin() as conn:
+        conn.execute(ContentHit.__table__.insert().values(content_id=content_id))
+
+
+def touch_last_active(user_id: str, seen_at: datetime):
+    """Record a user's activity with a single UPDATE (run after the response is sent)"""
+    with engine.begin() as conn:
+        conn.execute(
+            User.__table__.update()
+            .where(User.__table__.c.user_id == user_id)
+            .values(last_active=seen_at)
+        )
+
+
+def flush_content_hits():
+    """
+    Fold pending content_hits into generated_content.access_count
+
+    DELETE ... RETURNING consumes exactly the hits it aggregates, so hits
+    inserted concurrently are kept for the next flush. The applied total is
+    added to the gen_queries_total platform counter in the same statement.
+    Other dialects get the same effect from an id high-water mark in one
+    transaction.
+    """
+    if engine.dialect.name != 'postgresql':
+        _flush_content_hits_portable()
+        return
+    with engine.begin() as conn:
+        conn.execute(text("""
+            WITH moved AS (DELETE FROM content_hits RETURNING content_id),
+            counts AS (SELECT content_id, COUNT(*) AS n FROM moved GROUP BY content_id),
+            bumped AS (
+                UPDATE generated_content gc
+                SET access_count = COALESCE(gc.access_count, 0) + counts.n
+                FROM counts
+                WHERE gc.id = counts.content_id
+                RETURNING counts.n
+            )
+            INSERT INTO platform_stats (key, value)
+            SELECT 'gen_queries_total', COALESCE(SUM(n), 0) FROM bumped
+            ON CONFLICT (key) DO UPDATE SET value = platform_stats.value + EXCLUDED.value
+        """))
+
+
+def _flush_content_hits_portable():
+    """flush_content_hits for dialects without data-modifying CTEs (e.g. SQLite)"""
+    hits = ContentHit.__table__
+    content = GeneratedContent.__table__
+    with engine.begin() as conn:
+        last_id = conn.scalar(select(func.max(hits.c.id)))
+        if last_id is None:
+            return
+
+        # Hits for deleted content are dropped, as in the PostgreSQL statement
+        counts = conn.execute(
+            select(hits.c.content_id, func.count().label('n'))
+            .join(content, content.c.id == hits.c.content_id)
+            .where(hits.c.id <= last_id)
+            .group_by(hits.c.content_id)
+        ).all()
+        if counts:
+            conn.execute(
+                content.update()
+                .where(content.c.id == bindparam('hit_content_id'))
+                .values(access_count=func.coalesce(content.c.access_count, 0) + bindparam('hits')),
+                [{'hit_content_id': content_id, 'hits': n} for content_id, n in counts]
+            )
+            bump_platform_stat(conn, 'gen_queries_total', sum(n for _, n in counts))
+        conn.execute(hits.delete().where(hits.c.id <= last_id))
+
+
 def init_db():
     """Initialize database tables"""
     Base.metadata.create_all(bind=engine)
+    if engine.dialect.name == 'postgresql':
+        with engine.begin() as conn:
+            create_stats_views(conn)
+
+
+# One-row bookkeeping table, kept out of Base.metadata so it doesn't affect the fingerprint
+schema_meta = Table(
+    '_schema_meta',
+    MetaData(),
+    Column('fingerprint', String(64), primary_key=True)
+)
+
+
+def schema_fingerprint() -> str:
+    """Hash of the model table names; changes whenever a table is added or removed"""
+    return hashlib.sha256(",".join(sorted(Base.metadata.tables.keys())).encode()).hexdigest()
+
+
+def init_db_if_needed() -> bool:
+    """
+    Run init_db only when the model tables changed since the last startup
+
+    A warm database costs one 1-row SELECT instead of a per-table existence
+    check. Returns True if create_all ran.
+    """
+    fingerprint = schema_fingerprint()
+    try:
+        with engine.connect() as conn:
+            stored = conn.execute(select(schema_meta.c.fingerprint)).scalar()
+    except SQLAlchemyError:
+        stored = None  # First run: bookkeeping table doesn't exist yet
+
+    if stored == fingerprint:
+        return False
+
+    init_db()
+    schema_meta.create(bind=engine, checkfirst=True)
+    with engine.begin() as conn:
+        conn.execute(schema_meta.delete())
+        conn.execute(schema_meta.insert().values(fingerprint=fingerprint))
+    return True
 
 
 def get_db():
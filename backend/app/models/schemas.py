@@ -1,4 +1,4 @@
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, EmailStr, Field
 from typing import List, Optional, Dict, Any
 from datetime import datetime
 
@@ -17,6 +17,10 @@ class NodeBase(BaseModel):
     icon: Optional[str] = "📚"
     content_path: Optional[str] = None
     extra_metadata: Optional[Dict[str, Any]] = None
+    learning_path: Optional[str] = None
+    sequence_order: Optional[int] = None
+    prerequisites_ids: Optional[List[int]] = None
+    tags: Optional[List[str]] = None
 
 
 class NodeCreate(NodeBase):
@@ -28,8 +32,7 @@ class NodeResponse(NodeBase):
     children_ids: List[int] = []
     parent_ids: List[int] = []
 
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
 
 class MindMapResponse(BaseModel):
@@ -91,8 +94,7 @@ class UserResponse(BaseModel):
     created_at: datetime
     last_active: datetime
 
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
 
 class UserUpdate(BaseModel):
@@ -102,6 +104,19 @@ class UserUpdate(BaseModel):
     preferences: Optional[Dict[str, Any]] = None
 
 
+class ProfileUpdate(BaseModel):
+    """Professional profile fields a user may edit (unknown keys are ignored)"""
+    name: Optional[str] = None
+    email: Optional[EmailStr] = None
+    phone: Optional[str] = None
+    cv_url: Optional[str] = None
+    linkedin_url: Optional[str] = None
+    education_level: Optional[str] = None
+    job_role: Optional[str] = None
+    years_experience: Optional[int] = Field(None, ge=0)
+    target_roles: Optional[List[str]] = None
+
+
 class ContentRating(BaseModel):
     """Rating feedback for generated content"""
     generated_content_id: int
@@ -152,8 +167,7 @@ class LearningPathResponse(BaseModel):
     created_at: datetime
     updated_at: datetime
 
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
 
 class TopicCoverageCheck(BaseModel):
@@ -1,12 +1,16 @@
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, UploadFile, File, Form
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
-from sqlalchemy import func, desc
-from app.models.database import get_db, Node, User, UserProgress, GeneratedContent, TopicStructure, SectionContent
+from sqlalchemy import case, desc, func, select, text
+from app.models.database import get_db, GeneratedContent, ContentHit, PlatformStat, User, TopicStructure, SectionContent, STATS_VIEWS
 from app.models.schemas import UsageStats
+from app.config.settings import settings
+from app.utils.ttl_cache import TTLCache
 from datetime import datetime, timedelta
-from typing import List
+from types import SimpleNamespace
+from typing import Optional
+import hashlib
 import os
-import shutil
 from pathlib import Path
 
 router = APIRouter(prefix="/api/admin", tags=["admin"])
@@ -14,90 +18,129 @@ router = APIRouter(prefix="/api/admin", tags=["admin"])
 # Content upload directory
 CONTENT_DIR = Path(__file__).parent.parent.parent.parent / "content"
 
+# Allowed content file types, shared by upload validation and the library listing
+CONTENT_EXTENSIONS = frozenset({'.md', '.pdf', '.txt'})
+_CONTENT_EXTENSIONS_HINT = ", ".join(sorted(CONTENT_EXTENSIONS))
+MAX_UPLOAD_BYTES = settings.MAX_UPLOAD_MB * 1024 * 1024
+UPLOAD_CHUNK_BYTES = 1024 * 1024
+
+
+# Dashboard numbers barely move second-to-second; concurrent refreshes share one compute
+_STATS_CACHE = TTLCache(maxsize=1, ttl=30)
+
+# Library listing keyed by the directory mtimes (adds/removes/renames show up at
+# once; in-place edits within the TTL). Feedback is short-lived, keyed by filter args.
+_LIBRARY_CACHE = TTLCache(maxsize=1, ttl=300)
+_FEEDBACK_CACHE = TTLCache(maxsize=256, ttl=10)
+
+# All dashboard aggregates in one round-trip on PostgreSQL (other dialects use
+# _usage_stats_row_portable); grouped results come back as JSON arrays.
+# Generated-content totals come from the platform_stats counters; top topics and
+# per-type totals read from materialized views refreshed in the background.
+USAGE_STATS_SQL = text("""
+    WITH u AS (
+        SELECT COUNT(*) AS total_users,
+               COUNT(*) FILTER (WHERE last_active >= :yday) AS active_users_24h
+        FROM users
+    ),
+    g AS (SELECT COALESCE(SUM(value) FILTER (WHERE key = 'gen_queries_total'), 0)
+                   + (SELECT COUNT(*) FROM content_hits) AS queries,
+                 COALESCE(SUM(value) FILTER (WHERE key = 'gen_count'), 0) AS cached
+          FROM platform_stats),
+    t AS (SELECT COALESCE(SUM(access_count), 0) AS queries, COUNT(*) AS cached FROM topic_structures),
+    s AS (SELECT COALESCE(SUM(access_count), 0) AS queries, COUNT(*) AS cached FROM section_contents),
+    top_topics AS (SELECT node_id, title, access_count FROM mv_top_topics),
+    gen_types AS (SELECT content_type, count FROM mv_content_type_stats),
+    ratings AS (
+        SELECT difficulty_level, AVG(rating) AS avg_rating
+        FROM generated_content
+        WHERE rating IS NOT NULL
+        GROUP BY difficulty_level
+    )
+    SELECT u.total_users,
+           u.active_users_24h,
+           g.queries AS gen_queries,
+           t.queries AS topic_queries,
+           s.queries AS section_queries,
+           g.cached + t.cached + s.cached AS total_cached,
+           (SELECT COALESCE(json_agg(row_to_json(top_topics) ORDER BY node_id), '[]')
+            FROM top_topics) AS most_accessed,
+           (SELECT COALESCE(json_agg(json_build_array(content_type, count)), '[]')
+            FROM gen_types) AS gen_types,
+           (SELECT COALESCE(json_agg(json_build_array(difficulty_level, avg_rating)), '[]')
+            FROM ratings) AS ratings
+    FROM u, g, t, s
+""")
 
-@router.get("/stats", response_model=UsageStats)
-def get_usage_stats(db: Session = Depends(get_db)):
-    """Get platform usage statistics"""
-
-    # Total users
-    total_users = db.query(func.count(User.id)).scalar()
 
-    # Active users in last 24h
+@router.get("/stats", response_model=UsageStats)
+def get_usage_stats(request: Request, db: Session = Depends(get_db)):
+    """
+    Get platform usage statistics
+
+    The serialized payload is cached for 30s and tagged with an ETag;
+    dashboards polling with a matching If-None-Match get an empty 304.
+    """
+    cached = _STATS_CACHE.get("usage")
+    if cached is None:
+        body = _compute_usage_stats(db).model_dump_json().encode()
+        etag = f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"'
+        cached = (body, etag)
+        _STATS_CACHE.set("usage", cached)
+
+    body, etag = cached
+    headers = {"ETag": etag, "Cache-Control": "private, max-age=15"}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+def _compute_usage_stats(db: Session) -> UsageStats:
+    """Run the aggregate query and shape it into UsageStats"""
     yesterday = datetime.utcnow() - timedelta(hours=24)
-    active_users_24h = db.query(func.count(User.id)).filter(
-        User.last_active >= yesterday
-    ).scalar()
+    if db.get_bind().dialect.name == 'postgresql':
+        row = db.execute(USAGE_STATS_SQL, {"yday": yesterday}).one()
+    else:
+        row = _usage_stats_row_portable(db, yesterday)
 
     # Total queries (sum access_count from all content tables)
-    gen_queries = db.query(func.sum(GeneratedContent.access_count)).scalar() or 0
-    topic_queries = db.query(func.sum(TopicStructure.access_count)).scalar() or 0
-    section_queries = db.query(func.sum(SectionContent.access_count)).scalar() or 0
-    total_queries = gen_queries + topic_queries + section_queries
-
-    # Cache hit rate calculation
-    gen_cached = db.query(func.count(GeneratedContent.id)).scalar() or 0
-    topic_cached = db.query(func.count(TopicStructure.id)).scalar() or 0
-    section_cached = db.query(func.count(SectionContent.id)).scalar() or 0
-    total_cached = gen_cached + topic_cached + section_cached
+    total_queries = row.gen_queries + row.topic_queries + row.section_queries
 
     # Handle zero case to avoid negative percentages
     if total_queries == 0:
         cache_hit_rate = 0.0
     else:
-        cache_hit_rate = (total_queries - total_cached) / total_queries
+        cache_hit_rate = (total_queries - row.total_cached) / total_queries
 
     # Most accessed topics (from SectionContent - the main content table)
     # Note: This only tracks section content, not topic structures
-    most_accessed_raw = db.query(
-        SectionContent.topic_name,
-        func.sum(SectionContent.access_count).label('total_access')
-    ).group_by(SectionContent.topic_name).order_by(
-        desc('total_access')
-    ).limit(10).all()
-
-    most_accessed_nodes = [
-        {"node_id": idx, "title": topic.topic_name, "access_count": topic.total_access}
-        for idx, topic in enumerate(most_accessed_raw, 1)
-    ]
+    # (rows arrive already shaped as {node_id, title, access_count})
+    most_accessed_nodes = row.most_accessed
 
     # Popular content types (aggregate from all tables)
     popular_content_types = {}
 
     # Section content (learning path lessons)
-    section_count = db.query(func.sum(SectionContent.access_count)).scalar() or 0
-    if section_count > 0:
-        popular_content_types['mastery_path_lesson'] = section_count
+    if row.section_queries > 0:
+        popular_content_types['mastery_path_lesson'] = row.section_queries
 
     # Topic structures (week/section structures)
-    topic_structures_count = db.query(func.sum(TopicStructure.access_count)).scalar() or 0
-    if topic_structures_count > 0:
-        popular_content_types['topic_structure'] = topic_structures_count
+    if row.topic_queries > 0:
+        popular_content_types['topic_structure'] = row.topic_queries
 
     # Old generated content (explanation, example, quiz, etc.)
-    gen_types = db.query(
-        GeneratedContent.content_type,
-        func.sum(GeneratedContent.access_count).label('count')
-    ).group_by(GeneratedContent.content_type).all()
-
-    for stat in gen_types:
-        popular_content_types[stat.content_type] = stat.count
+    for content_type, count in row.gen_types:
+        popular_content_types[content_type] = count
 
     # Average rating by difficulty level
-    rating_by_difficulty = db.query(
-        GeneratedContent.difficulty_level,
-        func.avg(GeneratedContent.rating).label('avg_rating')
-    ).filter(
-        GeneratedContent.rating.isnot(None)
-    ).group_by(GeneratedContent.difficulty_level).all()
-
     avg_rating_by_difficulty = {
-        stat.difficulty_level: float(stat.avg_rating) if stat.avg_rating else 0.0
-        for stat in rating_by_difficulty
+        difficulty_level: float(avg_rating) if avg_rating else 0.0
+        for difficulty_level, avg_rating in row.ratings
     }
 
     return UsageStats(
-        total_users=total_users,
-        active_users_24h=active_users_24h,
+        total_users=row.total_users,
+        active_users_24h=row.active_users_24h,
         total_queries=total_queries,
         cache_hit_rate=cache_hit_rate,
         most_accessed_nodes=most_accessed_nodes,
@@ -106,32 +149,130 @@ def get_usage_stats(db: Session = Depends(get_db)):
     )
 
 
+def _usage_stats_row_portable(db: Session, yesterday: datetime) -> SimpleNamespace:
+    """
+    The USAGE_STATS_SQL row from portable queries (SQLite fallback)
+
+    One query per aggregate; the materialized views don't exist here, so
+    their defining queries run directly.
+    """
+    total_users, active_users_24h = db.execute(select(
+        func.count(),
+        func.coalesce(func.sum(case((User.last_active >= yesterday, 1), else_=0)), 0)
+    ).select_from(User)).one()
+
+    platform_stats = dict(db.execute(select(PlatformStat.key, PlatformStat.value)).all())
+    pending_hits = db.scalar(select(func.count()).select_from(ContentHit))
+
+    topic_queries, topic_cached = db.execute(select(
+        func.coalesce(func.sum(TopicStructure.access_count), 0), func.count()
+    ).select_from(TopicStructure)).one()
+    section_queries, section_cached = db.execute(select(
+        func.coalesce(func.sum(SectionContent.access_count), 0), func.count()
+    ).select_from(SectionContent)).one()
+
+    ratings = db.execute(
+        select(GeneratedContent.difficulty_level, func.avg(GeneratedContent.rating))
+        .where(GeneratedContent.rating.isnot(None))
+        .group_by(GeneratedContent.difficulty_level)
+    ).all()
+
+    return SimpleNamespace(
+        total_users=total_users,
+        active_users_24h=active_users_24h,
+        gen_queries=platform_stats.get('gen_queries_total', 0) + pending_hits,
+        topic_queries=topic_queries,
+        section_queries=section_queries,
+        total_cached=platform_stats.get('gen_count', 0) + topic_cached + section_cached,
+        most_accessed=[
+            dict(item) for item in db.execute(text(STATS_VIEWS['mv_top_topics'][0])).mappings()
+        ],
+        gen_types=db.execute(text(STATS_VIEWS['mv_content_type_stats'][0])).all(),
+        ratings=ratings
+    )
+
+
+def _sendfile_upload(source, destination) -> Optional[int]:
+    """
+    Zero-copy an upload that the SpooledTemporaryFile has rolled over to disk
+
+    Returns the bytes copied, or None when the upload is still in memory
+    (or sendfile is unavailable) and the caller should copy in chunks.
+    """
+    if not getattr(source, "_rolled", False) or not hasattr(os, "sendfile"):
+        return None
+    try:
+        size = os.fstat(source.fileno()).st_size
+        offset = 0
+        while offset < size:
+            sent = os.sendfile(destination.fileno(), source.fileno(), offset, size - offset)
+            if sent == 0:
+                break
+            offset += sent
+        return offset
+    except OSError:
+        destination.seek(0)
+        destination.truncate()
+        return None
+
+
 @router.post("/upload-content")
 async def upload_content(
+    request: Request,
     category: str = Form(...),
     file: UploadFile = File(...)
 ):
     """Upload markdown or PDF content file"""
 
+    too_large = HTTPException(
+        status_code=413,
+        detail=f"File too large. Maximum upload size is {settings.MAX_UPLOAD_MB} MB"
+    )
+    content_length = request.headers.get("content-length")
+    if content_length and content_length.isdigit() and int(content_length) > MAX_UPLOAD_BYTES:
+        raise too_large
+
     # Validate file type
-    allowed_extensions = {'.md', '.pdf', '.txt'}
     file_extension = Path(file.filename).suffix.lower()
 
-    if file_extension not in allowed_extensions:
+    if file_extension not in CONTENT_EXTENSIONS:
         raise HTTPException(
             status_code=400,
-            detail=f"File type {file_extension} not allowed. Use .md, .pdf, or .txt"
+            detail=f"File type {file_extension} not allowed. Use one of: {_CONTENT_EXTENSIONS_HINT}"
         )
 
     # Create category directory if it doesn't exist
     category_dir = CONTENT_DIR / category
-    category_dir.mkdir(parents=True, exist_ok=True)
+    await run_in_threadpool(category_dir.mkdir, parents=True, exist_ok=True)
 
     # Save file
     file_path = category_dir / file.filename
 
-    with open(file_path, "wb") as buffer:
-        shutil.copyfileobj(file.file, buffer)
+    # Uploads already spooled to disk are copied kernel-side with sendfile;
+    # otherwise a chunked copy with blocking writes in the threadpool, so
+    # large PDFs don't stall the event loop for other requests
+    buffer = await run_in_threadpool(open, file_path, "wb")
+    completed = False
+    try:
+        written = await run_in_threadpool(_sendfile_upload, file.file, buffer)
+        if written is None:
+            written = 0
+            while chunk := await file.read(UPLOAD_CHUNK_BYTES):
+                written += len(chunk)
+                if written > MAX_UPLOAD_BYTES:
+                    raise too_large
+                await run_in_threadpool(buffer.write, chunk)
+        elif written > MAX_UPLOAD_BYTES:
+            raise too_large
+        completed = True
+    finally:
+        # Closing flushes the last buffered write, so it stays off the loop too;
+        # a rejected or failed upload never leaves a partial file behind
+        await run_in_threadpool(buffer.close)
+        if not completed:
+            await run_in_threadpool(file_path.unlink, missing_ok=True)
+
+    _LIBRARY_CACHE.clear()
 
     return {
         "message": "File uploaded successfully",
@@ -146,11 +287,19 @@ async def upload_content(
 def invalidate_cache(
     node_id: int = None,
     content_type: str = None,
+    confirm: bool = False,
     db: Session = Depends(get_db)
 ):
     """Invalidate cached content (force regeneration)"""
 
-    query = db.query(GeneratedContent)
+    # Guard against an accidental table-wide invalidation
+    if node_id is None and content_type is None and not confirm:
+        raise HTTPException(
+            status_code=400,
+            detail="Specify node_id and/or content_type, or pass confirm=true to invalidate everything"
+        )
+
+    query = db.query(GeneratedContent).filter(GeneratedContent.is_valid == True)
 
     if node_id:
         query = query.filter(GeneratedContent.node_id == node_id)
@@ -158,9 +307,11 @@ def invalidate_cache(
     if content_type:
         query = query.filter(GeneratedContent.content_type == content_type)
 
-    # Mark as invalid
-    count = query.update({"is_valid": False})
-    db.commit()
+    # Mark as invalid (single UPDATE, no identity-map scan)
+    count = query.update({"is_valid": False}, synchronize_session=False)
+    if count:
+        db.commit()
+        _STATS_CACHE.clear()
 
     return {
         "message": f"Invalidated {count} cached entries",
@@ -173,8 +324,15 @@ def invalidate_cache(
 def clear_cache(db: Session = Depends(get_db)):
     """Clear all cached content (use with caution!)"""
 
+    # Bulk delete skips the ORM delete events, so reset the counters here
     count = db.query(GeneratedContent).delete()
+    db.query(ContentHit).delete()
+    db.query(PlatformStat).filter(
+        PlatformStat.key.in_(('gen_count', 'gen_queries_total'))
+    ).update({"value": 0}, synchronize_session=False)
     db.commit()
+    _STATS_CACHE.clear()
+    _FEEDBACK_CACHE.clear()
 
     return {
         "message": f"Cleared {count} cached entries",
@@ -184,25 +342,35 @@ def clear_cache(db: Session = Depends(get_db)):
 
 @router.get("/content-library")
 def list_content_files():
-    """List all content files in the library"""
+    """List all content files in the library (cached until a directory changes)"""
 
     if not CONTENT_DIR.exists():
         return {"categories": []}
 
+    signature = _library_signature()
+    cached = _LIBRARY_CACHE.get("library")
+    if cached is not None and cached[0] == signature:
+        return cached[1]
+
     categories = []
 
-    for category_dir in CONTENT_DIR.iterdir():
-        if category_dir.is_dir():
+    # scandir yields entries with cached type info and a single stat() per file
+    with os.scandir(CONTENT_DIR) as category_entries:
+        for category_dir in category_entries:
+            if not category_dir.is_dir():
+                continue
+
             files = []
-            for file_path in category_dir.iterdir():
-                if file_path.is_file() and file_path.suffix in {'.md', '.pdf', '.txt'}:
-                    files.append({
-                        "filename": file_path.name,
-                        "size_kb": file_path.stat().st_size / 1024,
-                        "modified": datetime.fromtimestamp(
-                            file_path.stat().st_mtime
-                        ).isoformat()
-                    })
+            with os.scandir(category_dir.path) as file_entries:
+                for entry in file_entries:
+                    # Lower-cased like upload validation, so "Notes.PDF" is listed too
+                    if entry.is_file() and os.path.splitext(entry.name)[1].lower() in CONTENT_EXTENSIONS:
+                        st = entry.stat()
+                        files.append({
+                            "filename": entry.name,
+                            "size_kb": st.st_size / 1024,
+                            "modified": datetime.fromtimestamp(st.st_mtime).isoformat()
+                        })
 
             categories.append({
                 "category": category_dir.name,
@@ -210,7 +378,17 @@ def list_content_files():
                 "file_count": len(files)
             })
 
-    return {"categories": categories}
+    library = {"categories": categories}
+    _LIBRARY_CACHE.set("library", (signature, library))
+    return library
+
+
+def _library_signature() -> tuple:
+    """mtimes of the library and its category directories (one stat per category)"""
+    with os.scandir(CONTENT_DIR) as entries:
+        return (CONTENT_DIR.stat().st_mtime_ns,) + tuple(sorted(
+            (entry.name, entry.stat().st_mtime_ns) for entry in entries if entry.is_dir()
+        ))
 
 
 @router.get("/feedback")
@@ -219,9 +397,22 @@ def get_student_feedback(
     difficulty_level: int = None,
     db: Session = Depends(get_db)
 ):
-    """Get student feedback on generated content"""
+    """Get student feedback on generated content (cached for 10s per filter)"""
 
-    query = db.query(GeneratedContent).filter(
+    cache_key = (min_rating, difficulty_level)
+    cached = _FEEDBACK_CACHE.get(cache_key)
+    if cached is not None:
+        return cached
+
+    # Only the columns the response uses (skips the large text/JSON columns)
+    query = db.query(
+        GeneratedContent.node_id,
+        GeneratedContent.content_type,
+        GeneratedContent.difficulty_level,
+        GeneratedContent.rating,
+        GeneratedContent.access_count,
+        GeneratedContent.created_at
+    ).filter(
         GeneratedContent.rating.isnot(None)
     )
 
@@ -233,7 +424,7 @@ def get_student_feedback(
 
     feedback = query.order_by(desc(GeneratedContent.created_at)).limit(50).all()
 
-    return {
+    result = {
         "feedback_count": len(feedback),
         "feedback": [
             {
@@ -247,3 +438,5 @@ def get_student_feedback(
             for item in feedback
         ]
     }
+    _FEEDBACK_CACHE.set(cache_key, result)
+    return result
@@ -2,21 +2,33 @@
 Authentication routes for user registration and login
 """
 from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 from pydantic import BaseModel, EmailStr, Field
-from datetime import datetime, timedelta
+from datetime import datetime
 from typing import Optional
-from jose import jwt
+import hashlib
+import time
+import jwt
 from passlib.context import CryptContext
 
 from app.models.database import User, get_db
 from app.config.settings import settings
+from app.utils.ttl_cache import TTLCache
 
 router = APIRouter(prefix="/auth", tags=["Authentication"])
 
 # Password hashing with bcrypt (cost factor 12)
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=12)
 
+# Signing key and token lifetime, computed once instead of on every token
+_JWT_KEY = settings.JWT_SECRET_KEY.encode()
+_TOKEN_LIFETIME_SECONDS = settings.JWT_EXPIRATION_HOURS * 3600
+
+# Successful verifications, so re-logins within seconds skip a ~250ms bcrypt run.
+# Keyed on the stored hash as well, so a password change never matches a stale entry.
+_VERIFIED_LOGINS = TTLCache(maxsize=1024, ttl=30)
+
 
 # Pydantic models
 class UserRegistration(BaseModel):
@@ -61,15 +73,33 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
 
 
-def create_access_token(user_id: str, role: str) -> str:
-    """Create JWT access token with user_id and role in payload"""
-    expire = datetime.utcnow() + timedelta(hours=settings.JWT_EXPIRATION_HOURS)
+async def verify_login_password(user_id: str, plain_password: str, hashed_password: str) -> bool:
+    """Verify a login password in the threadpool, reusing recent successes"""
+    cache_key = (
+        user_id,
+        hashlib.sha256(f"{hashed_password}\0{plain_password}".encode()).digest()
+    )
+    if _VERIFIED_LOGINS.get(cache_key):
+        return True
+
+    verified = await run_in_threadpool(verify_password, plain_password, hashed_password)
+    if verified:
+        _VERIFIED_LOGINS.set(cache_key, True)
+    return verified
+
+
+def create_access_token(user_id: str, role: str, name: Optional[str] = None) -> str:
+    """
+    Create JWT access token with user_id, role and name in payload
+    These claims let get_current_user authenticate without a database query
+    """
     to_encode = {
         "sub": user_id,
         "role": role,
-        "exp": expire
+        "name": name,
+        "exp": int(time.time()) + _TOKEN_LIFETIME_SECONDS
     }
-    encoded_jwt = jwt.encode(to_encode, settings.JWT_SECRET_KEY, algorithm=settings.JWT_ALGORITHM)
+    encoded_jwt = jwt.encode(to_encode, _JWT_KEY, algorithm=settings.JWT_ALGORITHM)
     return encoded_jwt
 
 
@@ -102,7 +132,7 @@ async def register(registration: UserRegistration, db: Session = Depends(get_db)
             )
 
     # Hash password
-    password_hash = hash_password(registration.password)
+    password_hash = await run_in_threadpool(hash_password, registration.password)
 
     # Create new user
     new_user = User(
@@ -131,19 +161,19 @@ async def register(registration: UserRegistration, db: Session = Depends(get_db)
         new_user.company_url = registration.company_url
         new_user.recruiter_type = registration.recruiter_type
 
-    # Save to database
+    # Save to database (the response only uses values set above, so no
+    # refresh - reading the expired instance after commit would re-SELECT it)
     db.add(new_user)
     db.commit()
-    db.refresh(new_user)
 
     # Generate JWT token
-    access_token = create_access_token(new_user.user_id, new_user.role)
+    access_token = create_access_token(registration.user_id, registration.role, registration.name)
 
     return TokenResponse(
         access_token=access_token,
-        user_id=new_user.user_id,
-        role=new_user.role,
-        name=new_user.name
+        user_id=registration.user_id,
+        role=registration.role,
+        name=registration.name
     )
 
 
@@ -164,7 +194,7 @@ async def login(credentials: UserLogin, db: Session = Depends(get_db)):
         )
 
     # Verify password
-    if not verify_password(credentials.password, user.password_hash):
+    if not await verify_login_password(user.user_id, credentials.password, user.password_hash):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid credentials",
@@ -176,7 +206,7 @@ async def login(credentials: UserLogin, db: Session = Depends(get_db)):
     db.commit()
 
     # Generate JWT token
-    access_token = create_access_token(user.user_id, user.role)
+    access_token = create_access_token(user.user_id, user.role, user.name)
 
     return TokenResponse(
         access_token=access_token,
@@ -1,19 +1,59 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from sqlalchemy import func
-from app.models.database import get_db, Node, GeneratedContent, User
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Response
+from sqlalchemy.orm import Session, joinedload
+from sqlalchemy import bindparam, func, select
+from app.models.database import get_db, Node, GeneratedContent, GeneratedContentBody, User, job_description_hash, insert_generated_content, log_content_hit, touch_last_active
 from app.models.schemas import QueryRequest, QueryResponse, ContentGenerationRequest
 from app.services.vector_store import vector_store
 from app.services.llm_service import llm_service
 from app.services.learning_path_service import learning_path_service, COMMON_ROLE_TEMPLATES
+from app.utils.ttl_cache import TTLCache
 from typing import Dict, Any, Optional
+from pydantic_core import to_json
 from datetime import datetime, timedelta
-import hashlib
+from contextlib import contextmanager
+import logging
+import threading
+import numpy as np
 
 router = APIRouter(prefix="/api/content", tags=["content"])
+logger = logging.getLogger(__name__)
 
+# All node titles, fed to related-topic suggestions on every generation
+_TOPIC_TITLES_CACHE = TTLCache(maxsize=1, ttl=300)
 
-def get_or_create_user(user_id: str, db: Session) -> User:
+# Title embeddings (titles, row-by-title, matrix), computed in one batched request
+_TOPIC_EMBEDDINGS_CACHE = TTLCache(maxsize=1, ttl=3600)
+
+# How many nearest titles the LLM chooses related topics from
+RELATED_TOPIC_CANDIDATES = 30
+
+# Length of the source chunk previews returned alongside generated content
+SOURCE_PREVIEW_CHARS = 200
+
+# Minimum gap between last_active writes for the same user
+LAST_ACTIVE_WRITE_INTERVAL = timedelta(seconds=60)
+
+# In-flight generations by cache key: [lock, number of requests using it]
+_GENERATION_LOCKS = {}
+_GENERATION_LOCKS_GUARD = threading.Lock()
+
+
+def invalidate_topic_titles():
+    """Drop the cached node titles (and their embeddings) after any node change"""
+    _TOPIC_TITLES_CACHE.clear()
+    _TOPIC_EMBEDDINGS_CACHE.clear()
+
+
+def _load_all_titles(db: Session) -> list:
+    """Node titles through the cache, loading only the title column on a miss"""
+    titles = _TOPIC_TITLES_CACHE.get("titles")
+    if titles is None:
+        titles = [title for (title,) in db.query(Node.title).all()]
+        _TOPIC_TITLES_CACHE.set("titles", titles)
+    return titles
+
+
+def get_or_create_user(user_id: str, db: Session, background_tasks: BackgroundTasks) -> User:
     """Get existing user or create new one with default settings"""
     user = db.query(User).filter(User.user_id == user_id).first()
     if not user:
@@ -22,15 +62,116 @@ def get_or_create_user(user_id: str, db: Session) -> User:
         db.commit()
         db.refresh(user)
     else:
-        # Update last_active timestamp
-        user.last_active = datetime.utcnow()
-        db.commit()
+        # Bump last_active at most once a minute, after the response is sent,
+        # so the query path itself never writes or commits for it
+        now = datetime.utcnow()
+        if user.last_active is None or now - user.last_active > LAST_ACTIVE_WRITE_INTERVAL:
+            background_tasks.add_task(touch_last_active, user_id, now)
     return user
 
 
+def _release_connection(db: Session) -> None:
+    """
+    End the session's transaction so its pooled connection goes back before a
+    long wait; loaded objects stay usable and the next query checks one out again
+    """
+    db.expire_on_commit = False
+    try:
+        db.commit()
+    finally:
+        db.expire_on_commit = True
+
+
+@contextmanager
+def _single_flight(key, on_wait=None):
+    """
+    Serialize work per key within this process; the lock is dropped once unused
+
+    on_wait runs only when another request holds the key, just before blocking.
+    """
+    with _GENERATION_LOCKS_GUARD:
+        entry = _GENERATION_LOCKS.get(key)
+        if entry is None:
+            entry = _GENERATION_LOCKS[key] = [threading.Lock(), 0]
+        entry[1] += 1
+    try:
+        lock = entry[0]
+        if not lock.acquire(blocking=False):
+            if on_wait is not None:
+                on_wait()
+            lock.acquire()
+        try:
+            yield
+        finally:
+            lock.release()
+    finally:
+        with _GENERATION_LOCKS_GUARD:
+            entry[1] -= 1
+            if entry[1] == 0:
+                del _GENERATION_LOCKS[key]
+
+
+def _cache_lookup(key_column):
+    """Valid cached row for (node, type, cache key, version), with its serialized response"""
+    return (
+        select(GeneratedContent)
+        .options(joinedload(GeneratedContent.body).load_only(GeneratedContentBody.response_json))
+        .where(
+            GeneratedContent.node_id == bindparam("node_id"),
+            GeneratedContent.content_type == bindparam("content_type"),
+            key_column == bindparam("cache_key"),
+            GeneratedContent.content_version == bindparam("content_version"),
+            GeneratedContent.is_valid == True
+        )
+        .limit(1)
+    )
+
+
+# Built once at import; each request only binds parameters, and SQLAlchemy's
+# compiled cache reuses the SQL for all three lookup shapes
+_CACHE_LOOKUP_BY_ROLE = _cache_lookup(GeneratedContent.role_template_id)
+_CACHE_LOOKUP_BY_JOB_HASH = _cache_lookup(GeneratedContent.job_profile_hash)
+_CACHE_LOOKUP_BY_DIFFICULTY = _cache_lookup(GeneratedContent.difficulty_level)
+
+
+def _candidate_topics(db: Session, current_topic: str) -> list:
+    """
+    Titles nearest to current_topic by embedding similarity
+
+    Keeps the related-topics prompt at RELATED_TOPIC_CANDIDATES titles instead
+    of the whole catalogue. Falls back to every title when the catalogue is
+    small, the topic is unknown, or embeddings are unavailable.
+    """
+    titles = _load_all_titles(db)
+    if len(titles) <= RELATED_TOPIC_CANDIDATES:
+        return titles
+
+    cached = _TOPIC_EMBEDDINGS_CACHE.get("embeddings")
+    if cached is None:
+        try:
+            vectors = vector_store.generate_embeddings(titles)
+        except Exception:
+            return titles
+        if not vectors:
+            return titles
+        # OpenAI embeddings are unit length, so a dot product is cosine similarity
+        row_by_title = {title: row for row, title in enumerate(titles)}
+        cached = (titles, row_by_title, np.asarray(vectors, dtype=np.float32))
+        _TOPIC_EMBEDDINGS_CACHE.set("embeddings", cached)
+
+    embedded_titles, row_by_title, matrix = cached
+    row = row_by_title.get(current_topic)
+    if row is None:
+        return titles
+
+    nearest = np.argsort(-(matrix @ matrix[row]))[:RELATED_TOPIC_CANDIDATES + 1]
+    return [embedded_titles[i] for i in nearest if i != row][:RELATED_TOPIC_CANDIDATES]
+
+
 @router.post("/query", response_model=QueryResponse)
 def query_content(
     request: QueryRequest,
+    background_tasks: BackgroundTasks,
     db: Session = Depends(get_db)
 ):
     """
@@ -43,16 +184,17 @@ def query_content(
     - visualization: Interactive visualization config
     """
     # Get node information
-    node = db.query(Node).filter(Node.id == request.node_id).first()
+    node = db.get(Node, request.node_id)
     if not node:
         raise HTTPException(status_code=404, detail="Node not found")
 
     # Get or create user
-    user = get_or_create_user(request.user_id, db)
+    user = get_or_create_user(request.user_id, db, background_tasks)
 
     # Determine cache key strategy based on user's job profile
     job_profile: Optional[Dict[str, Any]] = None
     cache_key: Optional[str] = None
+    difficulty_level: Optional[int] = None
     use_job_based = False
 
     if user.job_description and len(user.job_description) > 20:
@@ -77,7 +219,8 @@ def query_content(
         if user.job_role_type in COMMON_ROLE_TEMPLATES:
             cache_key = user.job_role_type  # Template-based caching
         else:
-            cache_key = hashlib.md5(user.job_description.encode()).hexdigest()[:16]  # Custom job hash
+            # Custom job hash, precomputed when job_description is written
+            cache_key = user.job_profile_hash or job_description_hash(user.job_description)
     else:
         # Fallback: use old difficulty-based system for backward compat
         difficulty_level = user.learning_level or 3
@@ -89,53 +232,82 @@ def query_content(
         node_version = node.extra_metadata.get('content_version', 1)
 
     # Check cache first (unless force_regenerate is True)
-    if not request.force_regenerate:
-        if use_job_based:
-            # Job-based cache lookup
-            if user.job_role_type in COMMON_ROLE_TEMPLATES:
-                cached = db.query(GeneratedContent).filter(
-                    GeneratedContent.node_id == request.node_id,
-                    GeneratedContent.content_type == request.query_type,
-                    GeneratedContent.role_template_id == cache_key,
-                    GeneratedContent.content_version == node_version,
-                    GeneratedContent.is_valid == True
-                ).first()
-            else:
-                cached = db.query(GeneratedContent).filter(
-                    GeneratedContent.node_id == request.node_id,
-                    GeneratedContent.content_type == request.query_type,
-                    GeneratedContent.job_profile_hash == cache_key,
-                    GeneratedContent.content_version == node_version,
-                    GeneratedContent.is_valid == True
-                ).first()
+    if use_job_based:
+        # Job-based cache lookup (template role or custom job hash)
+        if user.job_role_type in COMMON_ROLE_TEMPLATES:
+            lookup = _CACHE_LOOKUP_BY_ROLE
         else:
-            # Old difficulty-based cache lookup
-            cached = db.query(GeneratedContent).filter(
-                GeneratedContent.node_id == request.node_id,
-                GeneratedContent.content_type == request.query_type,
-                GeneratedContent.difficulty_level == difficulty_level,
-                GeneratedContent.content_version == node_version,
-                GeneratedContent.is_valid == True
-            ).first()
+            lookup = _CACHE_LOOKUP_BY_JOB_HASH
+        lookup_key = cache_key
+    else:
+        # Old difficulty-based cache lookup
+        lookup = _CACHE_LOOKUP_BY_DIFFICULTY
+        lookup_key = difficulty_level
+    lookup_params = {
+        "node_id": request.node_id,
+        "content_type": request.query_type,
+        "cache_key": lookup_key,
+        "content_version": node_version
+    }
 
+    if not request.force_regenerate:
+        cached = db.execute(lookup, lookup_params).scalars().first()
         if cached:
-            # Cache hit! Increment access count and return cached content
-            cached.access_count += 1
-            db.commit()
+            return _serve_cached(background_tasks, request, node, cached, cache_key, node_version)
+
+    # Concurrent misses for the same content wait for one generation, then
+    # re-check the cache instead of each paying for their own LLM calls.
+    # Neither the waiters nor the generating request hold a pooled connection
+    # while they block.
+    flight_key = (request.node_id, request.query_type, cache_key, node_version)
+    with _single_flight(flight_key, on_wait=lambda: _release_connection(db)):
+        if not request.force_regenerate:
+            cached = db.execute(lookup, lookup_params).scalars().first()
+            if cached:
+                return _serve_cached(background_tasks, request, node, cached, cache_key, node_version)
+
+        _release_connection(db)
+        return _generate_and_cache(
+            db, request, node, user, use_job_based, job_profile,
+            difficulty_level, cache_key, node_version
+        )
 
-            print(f"✓ Cache HIT: node={request.node_id}, type={request.query_type}, cache_key={cache_key}, version={node_version}")
 
-            return QueryResponse(
-                node_title=node.title,
-                content_type=request.query_type,
-                generated_content=cached.generated_content,
-                source_chunks=cached.source_chunks or [],
-                related_topics=cached.related_topics or [],
-                interactive_component=cached.interactive_component
-            )
+def _serve_cached(background_tasks: BackgroundTasks, request: QueryRequest, node: Node,
+                  cached: GeneratedContent, cache_key: str, node_version: int) -> Response:
+    """Return cached content; the hit is logged after the response is sent"""
+    # Folded into access_count periodically; no commit on the hit path
+    background_tasks.add_task(log_content_hit, cached.id)
 
+    logger.debug(
+        "Cache HIT: node=%s type=%s cache_key=%s version=%s",
+        request.node_id, request.query_type, cache_key, node_version
+    )
+
+    response_json = cached.body.response_json
+    if response_json is None:
+        # Cached before responses were stored serialized (loads the deferred columns)
+        response_json = QueryResponse(
+            node_title=node.title,
+            content_type=request.query_type,
+            generated_content=cached.body.generated_content,
+            source_chunks=cached.body.source_chunks or [],
+            related_topics=cached.body.related_topics or [],
+            interactive_component=cached.body.interactive_component
+        ).model_dump_json()
+
+    return Response(content=response_json, media_type="application/json")
+
+
+def _generate_and_cache(db: Session, request: QueryRequest, node: Node, user: User,
+                        use_job_based: bool, job_profile: Optional[Dict[str, Any]],
+                        difficulty_level: Optional[int], cache_key: str, node_version: int) -> Response:
+    """Generate content for a cache miss with the LLM and store it in the cache"""
     # Cache miss - generate new content
-    print(f"✗ Cache MISS: node={request.node_id}, type={request.query_type}, cache_key={cache_key}")
+    logger.info(
+        "Cache MISS: node=%s type=%s cache_key=%s",
+        request.node_id, request.query_type, cache_key
+    )
 
     # Retrieve relevant chunks from vector store
     search_query = f"{node.title} {node.description or ''}"
@@ -148,9 +320,12 @@ def query_content(
         top_k=5
     )
 
-    # Extract text from matches
+    # Extract text from matches; previews only get an ellipsis when truncated
     context_chunks = [match['text'] for match in matches]
-    source_chunks = [match['text'][:200] + "..." for match in matches]
+    source_chunks = [
+        text[:SOURCE_PREVIEW_CHARS] + "..." if len(text) > SOURCE_PREVIEW_CHARS else text
+        for text in context_chunks
+    ]
 
     # Generate content based on query type
     generated_content = ""
@@ -206,7 +381,7 @@ def query_content(
         quiz_data = llm_service.generate_quiz(
             topic=node.title,
             context_chunks=context_chunks,
-            difficulty=difficulty_level,
+            difficulty=difficulty_level if not use_job_based else 3,
             num_questions=5
         )
         generated_content = "## Interactive Quiz\n\nTest your understanding of the concepts.\n"
@@ -231,70 +406,63 @@ def query_content(
         raise HTTPException(status_code=400, detail=f"Unknown query type: {request.query_type}")
 
     # Get related topics suggestions
-    all_nodes = db.query(Node).all()
-    all_topics = [n.title for n in all_nodes]
     related_topics = llm_service.suggest_related_topics(
         current_topic=node.title,
-        all_topics=all_topics
+        all_topics=_candidate_topics(db, node.title)
     )
 
-    # Save to cache for future requests
+    # Serialized once: returned now and stored for cache hits to serve as-is
+    response_json = QueryResponse(
+        node_title=node.title,
+        content_type=request.query_type,
+        generated_content=generated_content,
+        source_chunks=source_chunks,
+        related_topics=related_topics[:5],
+        interactive_component=interactive_component
+    ).model_dump_json()
+
+    # Save to cache for future requests (skipped if a concurrent request got there first)
+    body = {
+        "generated_content": generated_content,
+        "interactive_component": interactive_component,
+        "source_chunks": source_chunks,
+        "related_topics": related_topics[:5],
+        "response_json": response_json
+    }
     if use_job_based:
         # Job-based cache
         if user.job_role_type in COMMON_ROLE_TEMPLATES:
-            cached_content = GeneratedContent(
-                node_id=request.node_id,
-                content_type=request.query_type,
-                role_template_id=cache_key,
-                generated_content=generated_content,
-                interactive_component=interactive_component,
-                source_chunks=source_chunks,
-                related_topics=related_topics[:5],
-                content_version=node_version,
-                access_count=1,
-                is_valid=True
-            )
+            cache_columns = {"role_template_id": cache_key}
         else:
-            cached_content = GeneratedContent(
-                node_id=request.node_id,
-                content_type=request.query_type,
-                job_profile_hash=cache_key,
-                generated_content=generated_content,
-                interactive_component=interactive_component,
-                source_chunks=source_chunks,
-                related_topics=related_topics[:5],
-                content_version=node_version,
-                access_count=1,
-                is_valid=True
-            )
+            cache_columns = {"job_profile_hash": cache_key}
     else:
         # Old difficulty-based cache
-        cached_content = GeneratedContent(
-            node_id=request.node_id,
-            content_type=request.query_type,
-            difficulty_level=difficulty_level,
-            generated_content=generated_content,
-            interactive_component=interactive_component,
-            source_chunks=source_chunks,
-            related_topics=related_topics[:5],
-            content_version=node_version,
-            access_count=1,
-            is_valid=True
-        )
+        cache_columns = {"difficulty_level": difficulty_level}
 
-    db.add(cached_content)
+    content_id = insert_generated_content(
+        db,
+        body,
+        node_id=request.node_id,
+        content_type=request.query_type,
+        content_version=node_version,
+        access_count=1,
+        is_valid=True,
+        **cache_columns
+    )
     db.commit()
 
-    print(f"✓ Content cached: node={request.node_id}, type={request.query_type}, cache_key={cache_key}, version={node_version}")
+    if content_id is None:
+        logger.info(
+            "Content already cached by a concurrent request: node=%s type=%s",
+            request.node_id, request.query_type
+        )
+    else:
+        logger.info(
+            "Content cached: node=%s type=%s cache_key=%s version=%s",
+            request.node_id, request.query_type, cache_key, node_version
+        )
 
-    return QueryResponse(
-        node_title=node.title,
-        content_type=request.query_type,
-        generated_content=generated_content,
-        source_chunks=source_chunks,
-        related_topics=related_topics[:5],
-        interactive_component=interactive_component
-    )
+    return Response(content=response_json, media_type="application/json")
 
 
 @router.get("/node/{node_id}/summary")
@@ -303,7 +471,7 @@ def get_node_summary(
     db: Session = Depends(get_db)
 ):
     """Get a quick summary of node content"""
-    node = db.query(Node).filter(Node.id == node_id).first()
+    node = db.get(Node, node_id)
     if not node:
         raise HTTPException(status_code=404, detail="Node not found")
 
@@ -374,39 +542,34 @@ def search_content(
 ):
     """Search across all content"""
 
-    # Build filter
-    filter_dict = {}
-    if category:
-        # Get node IDs in this category
-        nodes = db.query(Node).filter(Node.category == category).all()
-        node_ids = [n.id for n in nodes]
-        if node_ids:
-            # Note: Pinecone filters require exact match, so we'll filter results after
-            pass
-
-    # Search vector store
+    # Search vector store (category filtered by Pinecone, so results aren't dropped afterwards)
     matches = vector_store.search(
         query=query,
-        top_k=top_k
+        top_k=top_k,
+        category=category
     )
 
-    # Enrich results with node information
+    # Enrich results with node information (one IN query; the category check guards stale vector metadata)
+    node_ids = {match['metadata'].get('node_id') for match in matches} - {None}
+    node_query = db.query(Node.id, Node.title, Node.category).filter(Node.id.in_(node_ids))
+    if category:
+        node_query = node_query.filter(Node.category == category)
+    nodes = {node.id: node for node in node_query.all()} if node_ids else {}
+
     results = []
     for match in matches:
         node_id = match['metadata'].get('node_id')
-        if node_id:
-            node = db.query(Node).filter(Node.id == node_id).first()
-            if node and (not category or node.category == category):
-                results.append({
-                    "node_id": node_id,
-                    "node_title": node.title,
-                    "node_category": node.category,
-                    "text": match['text'],
-                    "score": match['score']
-                })
-
-    return {
-        "query": query,
-        "results": results,
-        "total": len(results)
-    }
+        node = nodes.get(node_id)
+        if node:
+            results.append({
+                "node_id": node_id,
+                "node_title": node.title,
+                "node_category": node.category,
+                "text": match['text'],
+                "score": match['score']
+            })
+
+    return Response(
+        content=to_json({"query": query, "results": results, "total": len(results)}),
+        media_type="application/json"
+    )
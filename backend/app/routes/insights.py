@@ -5,7 +5,7 @@ API routes for topic insights
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 from app.models.database import get_db, TopicInsights, Node
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict
 from typing import List, Optional
 
 router = APIRouter(prefix="/api/insights", tags=["insights"])
@@ -38,8 +38,7 @@ class TopicInsightsResponse(BaseModel):
     method_comparisons: List[MethodComparison]
     computational_notes: Optional[str] = None
 
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
 
 @router.get("/{node_id}", response_model=TopicInsightsResponse)
@@ -56,7 +55,7 @@ def get_topic_insights(node_id: int, db: Session = Depends(get_db)):
     """
 
     # Get the node
-    node = db.query(Node).filter(Node.id == node_id).first()
+    node = db.get(Node, node_id)
     if not node:
         raise HTTPException(status_code=404, detail="Topic not found")
 
@@ -1,11 +1,39 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
 from sqlalchemy.orm import Session
 from typing import List
-from app.models.database import get_db, Node, node_edges
+from pydantic import TypeAdapter
+from app.models.database import get_db, Node, node_edges, bulk_add_edges
 from app.models.schemas import NodeCreate, NodeResponse, MindMapResponse
-from sqlalchemy import select
+from app.utils.ttl_cache import TTLCache
+from app.routes.content import invalidate_topic_titles
+from sqlalchemy import delete, or_, select
+from collections import defaultdict
+import hashlib
+import logging
 
 router = APIRouter(prefix="/api/nodes", tags=["nodes"])
+logger = logging.getLogger(__name__)
+
+# Built once; validates and serializes a whole node list in one call
+_NODE_LIST_ADAPTER = TypeAdapter(List[NodeResponse])
+
+# Columns every node response carries (besides the edge id lists)
+_NODE_FIELDS = (
+    "id", "title", "slug", "category", "subcategory", "description",
+    "difficulty_level", "estimated_time_minutes", "x_position", "y_position",
+    "color", "icon", "content_path", "extra_metadata", "learning_path",
+    "sequence_order", "prerequisites_ids", "tags"
+)
+_NODE_COLUMNS = [getattr(Node, name) for name in _NODE_FIELDS]
+
+# Serialized mindmap payloads keyed by category filter: (json_bytes, etag)
+_MINDMAP_CACHE = TTLCache(maxsize=64, ttl=300)
+
+
+def invalidate_mindmap_cache():
+    """Drop cached mindmaps (and node titles) after any node or edge change"""
+    _MINDMAP_CACHE.clear()
+    invalidate_topic_titles()
 
 
 @router.get("/", response_model=List[NodeResponse])
@@ -14,86 +42,52 @@ def get_all_nodes(
     db: Session = Depends(get_db)
 ):
     """Get all nodes, optionally filtered by category"""
-    query = db.query(Node)
-
-    if category:
-        query = query.filter(Node.category == category)
-
-    nodes = query.all()
-
-    # Format response with relationships
-    response = []
-    for node in nodes:
-        node_dict = {
-            "id": node.id,
-            "title": node.title,
-            "slug": node.slug,
-            "category": node.category,
-            "subcategory": node.subcategory,
-            "description": node.description,
-            "difficulty_level": node.difficulty_level,
-            "estimated_time_minutes": node.estimated_time_minutes,
-            "x_position": node.x_position,
-            "y_position": node.y_position,
-            "color": node.color,
-            "icon": node.icon,
-            "content_path": node.content_path,
-            "extra_metadata": node.extra_metadata,  # Explicitly include this!
-            "children_ids": [child.id for child in node.children],
-            "parent_ids": [parent.id for parent in node.parents]
-        }
-        response.append(node_dict)
-
-    return response
+    return _node_list_response(_load_node_dicts(db, category))
 
 
 @router.get("/mindmap", response_model=MindMapResponse)
 def get_mindmap(
+    request: Request,
     category: str = None,
     db: Session = Depends(get_db)
 ):
-    """Get complete mind map structure for visualization"""
-    print(f"[DEBUG] Mindmap request - category filter: {category}")
-    query = db.query(Node)
-
-    if category:
-        query = query.filter(Node.category == category)
-
-    nodes = query.all()
-    print(f"[DEBUG] Query returned {len(nodes)} nodes")
-
-    # Build nodes list
-    nodes_response = []
-    edges = []
-
-    for node in nodes:
-        node_dict = {
-            "id": node.id,
-            "title": node.title,
-            "slug": node.slug,
-            "category": node.category,
-            "subcategory": node.subcategory,
-            "description": node.description,
-            "difficulty_level": node.difficulty_level,
-            "estimated_time_minutes": node.estimated_time_minutes,
-            "x_position": node.x_position,
-            "y_position": node.y_position,
-            "color": node.color,
-            "icon": node.icon,
-            "content_path": node.content_path,
-            "extra_metadata": node.extra_metadata,
-            "children_ids": [child.id for child in node.children],
-            "parent_ids": [parent.id for parent in node.parents]
-        }
-        nodes_response.append(node_dict)
-
-        # Build edges
-        for child in node.children:
-            edges.append({
-                "source": node.id,
-                "target": child.id,
-                "type": "prerequisite"
-            })
+    """
+    Get complete mind map structure for visualization
+
+    The serialized payload is cached for 5 minutes and tagged with an ETag;
+    clients sending a matching If-None-Match get an empty 304.
+    """
+    cached = _MINDMAP_CACHE.get(category)
+    if cached is None:
+        body = MindMapResponse.model_validate(_build_mindmap(category, db)).model_dump_json().encode()
+        etag = f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"'
+        cached = (body, etag)
+        _MINDMAP_CACHE.set(category, cached)
+
+    body, etag = cached
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+def _node_list_response(node_dicts: list) -> Response:
+    """Serialize node dicts as a List[NodeResponse] JSON response in one pass"""
+    nodes = _NODE_LIST_ADAPTER.validate_python(node_dicts)
+    return Response(content=_NODE_LIST_ADAPTER.dump_json(nodes), media_type="application/json")
+
+
+def _build_mindmap(category: str, db: Session) -> dict:
+    """Build the mindmap nodes/edges payload from the database"""
+    logger.debug("Mindmap request category=%s", category)
+    nodes_response = _load_node_dicts(db, category)
+    logger.debug("Mindmap query returned %d nodes", len(nodes_response))
+
+    edges = [
+        {"source": node["id"], "target": child_id, "type": "prerequisite"}
+        for node in nodes_response
+        for child_id in node["children_ids"]
+    ]
 
     return {
         "nodes": nodes_response,
@@ -101,35 +95,67 @@ def get_mindmap(
     }
 
 
+def _load_node_dicts(db: Session, category: str = None, node_ids: list = None) -> list:
+    """
+    Node response dicts with children_ids/parent_ids, optionally for one
+    category or for specific node ids
+
+    Reads plain column rows and the edge table with one query each and groups
+    the edges in Python - no ORM instances or relationship loads.
+    """
+    query = select(*_NODE_COLUMNS)
+    edge_query = select(node_edges.c.parent_id, node_edges.c.child_id)
+
+    selected_ids = None
+    if category:
+        query = query.where(Node.category == category)
+        selected_ids = select(Node.id).where(Node.category == category)
+    if node_ids is not None:
+        query = query.where(Node.id.in_(node_ids))
+        selected_ids = node_ids
+    if selected_ids is not None:
+        edge_query = edge_query.where(or_(
+            node_edges.c.parent_id.in_(selected_ids),
+            node_edges.c.child_id.in_(selected_ids)
+        ))
+
+    children_map = defaultdict(list)
+    parents_map = defaultdict(list)
+    for parent_id, child_id in db.execute(edge_query):
+        children_map[parent_id].append(child_id)
+        parents_map[child_id].append(parent_id)
+
+    return [
+        _serialize_node(row, children_map[row["id"]], parents_map[row["id"]])
+        for row in db.execute(query).mappings()
+    ]
+
+
+def _serialize_node(row, children_ids: list, parent_ids: list) -> dict:
+    """NodeResponse-shaped dict from a _NODE_COLUMNS row mapping"""
+    response = dict(row)
+    response["prerequisites_ids"] = response["prerequisites_ids"] or []
+    response["tags"] = response["tags"] or []
+    response["children_ids"] = children_ids
+    response["parent_ids"] = parent_ids
+    return response
+
+
+def _get_node_dict(db: Session, node_id: int) -> dict:
+    """Single node response dict, 404 if it does not exist"""
+    nodes = _load_node_dicts(db, node_ids=[node_id])
+    if not nodes:
+        raise HTTPException(status_code=404, detail="Node not found")
+    return nodes[0]
+
+
 @router.get("/{node_id}", response_model=NodeResponse)
 def get_node(
     node_id: int,
     db: Session = Depends(get_db)
 ):
     """Get a specific node by ID"""
-    node = db.query(Node).filter(Node.id == node_id).first()
-
-    if not node:
-        raise HTTPException(status_code=404, detail="Node not found")
-
-    return {
-        "id": node.id,
-        "title": node.title,
-        "slug": node.slug,
-        "category": node.category,
-        "subcategory": node.subcategory,
-        "description": node.description,
-        "difficulty_level": node.difficulty_level,
-        "estimated_time_minutes": node.estimated_time_minutes,
-        "x_position": node.x_position,
-        "y_position": node.y_position,
-        "color": node.color,
-        "icon": node.icon,
-        "content_path": node.content_path,
-        "extra_metadata": node.extra_metadata,
-        "children_ids": [child.id for child in node.children],
-        "parent_ids": [parent.id for parent in node.parents]
-    }
+    return _get_node_dict(db, node_id)
 
 
 @router.post("/", response_model=NodeResponse)
@@ -149,34 +175,19 @@ def create_node(
     # Create node without parent_ids
     node_dict = node_data.model_dump(exclude={'parent_ids'})
     node = Node(**node_dict)
+    db.add(node)
+    db.flush()
 
-    # Add parent relationships
+    # Add parent relationships (existing parents only, one INSERT)
     if parent_ids:
-        parents = db.query(Node).filter(Node.id.in_(parent_ids)).all()
-        node.parents.extend(parents)
+        existing_ids = db.execute(select(Node.id).where(Node.id.in_(parent_ids))).scalars()
+        bulk_add_edges(db, [(parent_id, node.id) for parent_id in existing_ids])
 
-    db.add(node)
+    node_id = node.id
     db.commit()
-    db.refresh(node)
+    invalidate_mindmap_cache()
 
-    return {
-        "id": node.id,
-        "title": node.title,
-        "slug": node.slug,
-        "category": node.category,
-        "subcategory": node.subcategory,
-        "description": node.description,
-        "difficulty_level": node.difficulty_level,
-        "estimated_time_minutes": node.estimated_time_minutes,
-        "x_position": node.x_position,
-        "y_position": node.y_position,
-        "color": node.color,
-        "icon": node.icon,
-        "content_path": node.content_path,
-        "extra_metadata": node.extra_metadata,
-        "children_ids": [child.id for child in node.children],
-        "parent_ids": [parent.id for parent in node.parents]
-    }
+    return _get_node_dict(db, node_id)
 
 
 @router.put("/{node_id}", response_model=NodeResponse)
@@ -186,7 +197,7 @@ def update_node(
     db: Session = Depends(get_db)
 ):
     """Update an existing node"""
-    node = db.query(Node).filter(Node.id == node_id).first()
+    node = db.get(Node, node_id)
 
     if not node:
         raise HTTPException(status_code=404, detail="Node not found")
@@ -196,32 +207,16 @@ def update_node(
         if value is not None:
             setattr(node, key, value)
 
-    # Update parent relationships if provided
+    # Update parent relationships if provided (replace the node's incoming edges)
     if hasattr(node_data, 'parent_ids') and node_data.parent_ids is not None:
-        parents = db.query(Node).filter(Node.id.in_(node_data.parent_ids)).all()
-        node.parents = parents
+        db.execute(delete(node_edges).where(node_edges.c.child_id == node_id))
+        existing_ids = db.execute(select(Node.id).where(Node.id.in_(node_data.parent_ids))).scalars()
+        bulk_add_edges(db, [(parent_id, node_id) for parent_id in existing_ids])
 
     db.commit()
-    db.refresh(node)
+    invalidate_mindmap_cache()
 
-    return {
-        "id": node.id,
-        "title": node.title,
-        "slug": node.slug,
-        "category": node.category,
-        "subcategory": node.subcategory,
-        "description": node.description,
-        "difficulty_level": node.difficulty_level,
-        "estimated_time_minutes": node.estimated_time_minutes,
-        "x_position": node.x_position,
-        "y_position": node.y_position,
-        "color": node.color,
-        "icon": node.icon,
-        "content_path": node.content_path,
-        "extra_metadata": node.extra_metadata,
-        "children_ids": [child.id for child in node.children],
-        "parent_ids": [parent.id for parent in node.parents]
-    }
+    return _get_node_dict(db, node_id)
 
 
 @router.delete("/{node_id}")
@@ -230,13 +225,14 @@ def delete_node(
     db: Session = Depends(get_db)
 ):
     """Delete a node"""
-    node = db.query(Node).filter(Node.id == node_id).first()
+    node = db.get(Node, node_id)
 
     if not node:
         raise HTTPException(status_code=404, detail="Node not found")
 
     db.delete(node)
     db.commit()
+    invalidate_mindmap_cache()
 
     return {"message": "Node deleted successfully"}
 
@@ -247,28 +243,4 @@ def get_nodes_by_category(
     db: Session = Depends(get_db)
 ):
     """Get all nodes in a specific category"""
-    nodes = db.query(Node).filter(Node.category == category).all()
-
-    response = []
-    for node in nodes:
-        node_dict = {
-            "id": node.id,
-            "title": node.title,
-            "slug": node.slug,
-            "category": node.category,
-            "subcategory": node.subcategory,
-            "description": node.description,
-            "difficulty_level": node.difficulty_level,
-            "estimated_time_minutes": node.estimated_time_minutes,
-            "x_position": node.x_position,
-            "y_position": node.y_position,
-            "color": node.color,
-            "icon": node.icon,
-            "content_path": node.content_path,
-            "extra_metadata": node.extra_metadata,
-            "children_ids": [child.id for child in node.children],
-            "parent_ids": [parent.id for parent in node.parents]
-        }
-        response.append(node_dict)
-
-    return response
+    return _node_list_response(_load_node_dicts(db, category))
@@ -1,10 +1,9 @@
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
-from app.models.database import get_db, UserProgress, Node
+from app.models.database import get_db, UserProgress, Node, node_edges
 from app.models.schemas import ProgressUpdate
-from app.services.progress_service import ProgressService
-from typing import List
-from sqlalchemy import func
+from app.services.progress_service import ProgressService, invalidate_user_views
+from sqlalchemy import Float, case, cast, exists, func, or_, select
 from pydantic import BaseModel
 
 router = APIRouter(prefix="/api/progress", tags=["progress"])
@@ -23,22 +22,30 @@ def get_user_progress(
     db: Session = Depends(get_db)
 ):
     """Get all progress for a user"""
-    progress_records = db.query(UserProgress).filter(
+    # Progress rows with their node title/category in one query (outer join
+    # keeps rows whose node was deleted)
+    progress_records = db.query(
+        UserProgress.node_id,
+        UserProgress.completed,
+        UserProgress.quiz_score,
+        UserProgress.time_spent_minutes,
+        Node.title,
+        Node.category
+    ).outerjoin(Node, Node.id == UserProgress.node_id).filter(
         UserProgress.user_id == user_id
     ).all()
 
-    # Enrich with node information
-    results = []
-    for record in progress_records:
-        node = db.query(Node).filter(Node.id == record.node_id).first()
-        results.append({
+    results = [
+        {
             "node_id": record.node_id,
-            "node_title": node.title if node else "Unknown",
-            "node_category": node.category if node else "Unknown",
+            "node_title": record.title or "Unknown",
+            "node_category": record.category or "Unknown",
             "completed": record.completed,
             "quiz_score": record.quiz_score,
             "time_spent_minutes": record.time_spent_minutes
-        })
+        }
+        for record in progress_records
+    ]
 
     # Calculate statistics
     total_nodes = db.query(func.count(Node.id)).scalar()
@@ -66,7 +73,7 @@ def update_progress(
 ):
     """Update user progress for a node"""
     # Check if node exists
-    node = db.query(Node).filter(Node.id == progress.node_id).first()
+    node = db.get(Node, progress.node_id)
     if not node:
         raise HTTPException(status_code=404, detail="Node not found")
 
@@ -94,6 +101,7 @@ def update_progress(
         db.add(new_progress)
 
     db.commit()
+    invalidate_user_views(progress.user_id)
 
     return {"message": "Progress updated successfully"}
 
@@ -104,53 +112,49 @@ def get_recommendations(
     db: Session = Depends(get_db)
 ):
     """Get personalized topic recommendations based on progress"""
-    # Get user's completed nodes
-    completed = db.query(UserProgress).filter(
+    # Nodes the user has completed (>= 80%)
+    completed_ids = select(UserProgress.node_id).where(
         UserProgress.user_id == user_id,
-        UserProgress.completed >= 80
-    ).all()
-
-    completed_node_ids = [p.node_id for p in completed]
-    completed_nodes = db.query(Node).filter(Node.id.in_(completed_node_ids)).all() if completed_node_ids else []
-
-    # Find nodes that have completed prerequisites
-    all_nodes = db.query(Node).all()
-    recommendations = []
-
-    for node in all_nodes:
-        if node.id in completed_node_ids:
-            continue  # Skip already completed
-
-        # Check if prerequisites are met
-        parent_ids = [p.id for p in node.parents]
-        if parent_ids:
-            # Has prerequisites
-            prerequisites_met = all(pid in completed_node_ids for pid in parent_ids)
-            if prerequisites_met:
-                recommendations.append({
-                    "node_id": node.id,
-                    "title": node.title,
-                    "category": node.category,
-                    "difficulty": node.difficulty_level,
-                    "reason": "Prerequisites completed"
-                })
-        else:
-            # No prerequisites - beginner topics
-            if node.difficulty_level <= 2:
-                recommendations.append({
-                    "node_id": node.id,
-                    "title": node.title,
-                    "category": node.category,
-                    "difficulty": node.difficulty_level,
-                    "reason": "Beginner topic"
-                })
-
-    # Sort by difficulty
-    recommendations.sort(key=lambda x: x['difficulty'])
+        UserProgress.completed >= 80,
+        UserProgress.node_id.isnot(None)
+    )
+
+    # Edge-table checks evaluated per node in SQL: any prerequisites at all,
+    # and any prerequisite not yet completed
+    has_prerequisites = exists().where(node_edges.c.child_id == Node.id)
+    unmet_prerequisites = exists().where(
+        node_edges.c.child_id == Node.id,
+        node_edges.c.parent_id.not_in(completed_ids)
+    )
+
+    # Uncompleted nodes whose prerequisites are all completed, or beginner
+    # topics without prerequisites - sorted by difficulty, in one query
+    nodes = db.query(
+        Node.id,
+        Node.title,
+        Node.category,
+        Node.difficulty_level,
+        has_prerequisites.label("has_prerequisites")
+    ).filter(
+        Node.id.not_in(completed_ids),
+        ~unmet_prerequisites,
+        or_(has_prerequisites, Node.difficulty_level <= 2)
+    ).order_by(Node.difficulty_level, Node.id).limit(10).all()
+
+    recommendations = [
+        {
+            "node_id": node.id,
+            "title": node.title,
+            "category": node.category,
+            "difficulty": node.difficulty_level,
+            "reason": "Prerequisites completed" if node.has_prerequisites else "Beginner topic"
+        }
+        for node in nodes
+    ]
 
     return {
         "user_id": user_id,
-        "recommendations": recommendations[:10]
+        "recommendations": recommendations
     }
 
 
@@ -162,6 +166,7 @@ def reset_user_progress(
     """Reset all progress for a user"""
     db.query(UserProgress).filter(UserProgress.user_id == user_id).delete()
     db.commit()
+    invalidate_user_views(user_id)
 
     return {"message": f"Progress reset for user {user_id}"}
 
@@ -172,33 +177,31 @@ def get_leaderboard(
     db: Session = Depends(get_db)
 ):
     """Get top learners by various metrics"""
-    # Get all users with their stats
-    users = db.query(UserProgress.user_id).distinct().all()
-    user_ids = [u[0] for u in users]
-
-    leaderboard = []
-    for user_id in user_ids:
-        progress_records = db.query(UserProgress).filter(
-            UserProgress.user_id == user_id
-        ).all()
-
-        completed_count = len([p for p in progress_records if p.completed == 100])
-        avg_score = sum([p.quiz_score for p in progress_records if p.quiz_score]) / len(progress_records) if progress_records else 0
-        total_time = sum([p.time_spent_minutes for p in progress_records])
-
-        leaderboard.append({
-            "user_id": user_id,
-            "completed_nodes": completed_count,
-            "average_quiz_score": round(avg_score, 2),
-            "total_time_minutes": total_time,
-            "score": completed_count * 100 + avg_score * 10  # Combined score
-        })
-
-    # Sort by combined score
-    leaderboard.sort(key=lambda x: x['score'], reverse=True)
+    # Per-user aggregates, combined score, ordering and limit all in one query
+    completed_count = func.sum(case((UserProgress.completed == 100, 1), else_=0))
+    # Quiz scores averaged over all of the user's topics (unscored count as 0)
+    avg_score = func.coalesce(func.sum(UserProgress.quiz_score), 0) / cast(func.count(), Float)
+    score = completed_count * 100 + avg_score * 10  # Combined score
+
+    rows = db.query(
+        UserProgress.user_id,
+        completed_count.label("completed_nodes"),
+        avg_score.label("average_quiz_score"),
+        func.coalesce(func.sum(UserProgress.time_spent_minutes), 0).label("total_time_minutes"),
+        score.label("score")
+    ).group_by(UserProgress.user_id).order_by(score.desc()).limit(limit).all()
 
     return {
-        "leaderboard": leaderboard[:limit]
+        "leaderboard": [
+            {
+                "user_id": row.user_id,
+                "completed_nodes": row.completed_nodes,
+                "average_quiz_score": round(row.average_quiz_score, 2),
+                "total_time_minutes": row.total_time_minutes,
+                "score": row.score
+            }
+            for row in rows
+        ]
     }
 
 
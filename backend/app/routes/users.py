@@ -1,19 +1,31 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Response
+from sqlalchemy import select
+from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.orm import Session
-from app.models.database import get_db, User, UserProgress, LearningPath
+from app.models.database import get_db, User, UserProgress, LearningPath, PathGenerationClaim, claim_path_generation, release_path_generation
 from app.models.schemas import (
-    UserCreate, UserResponse, UserUpdate, ContentRating,
+    UserCreate, UserResponse, UserUpdate, ProfileUpdate, ContentRating,
     JobProfileUpdate, LearningPathResponse, TopicCoverageCheck
 )
 from app.models.database import GeneratedContent
-from app.services.progress_service import ProgressService
+from app.services.progress_service import ProgressService, invalidate_user_views, progress_view_cache, dashboard_view_cache
 from app.services.learning_path_service import learning_path_service
 from app.utils.cost_tracker import cost_tracker
-from typing import List
+from pydantic_core import to_json
 from fastapi import Header
+from datetime import datetime, timedelta
+import hmac
+import logging
 import os
 
 router = APIRouter(prefix="/api/users", tags=["users"])
+logger = logging.getLogger(__name__)
+
+# Read once at import; compared in constant time
+_ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "demo-token-change-in-production").encode()
+
+# Learning paths a user may generate per window (configurable via environment variable)
+LEARNING_PATH_RATE_LIMIT_HOURS = int(os.getenv("LEARNING_PATH_RATE_LIMIT_HOURS", "24"))
 
 
 def verify_admin_token(x_admin_token: str = Header(None)):
@@ -21,75 +33,115 @@ def verify_admin_token(x_admin_token: str = Header(None)):
     if not x_admin_token:
         raise HTTPException(status_code=401, detail="Admin token required. Set X-Admin-Token header.")
 
-    admin_token = os.getenv("ADMIN_TOKEN", "demo-token-change-in-production")
-    if x_admin_token != admin_token:
+    if not hmac.compare_digest(x_admin_token.encode(), _ADMIN_TOKEN):
         raise HTTPException(status_code=403, detail="Invalid admin token")
     return True
 
 
+def get_user_or_404(user_id: str, db: Session = Depends(get_db)) -> User:
+    """
+    Path-parameter user lookup shared by the /{user_id} endpoints
+
+    FastAPI caches dependency results per request, so an endpoint (or
+    another dependency) asking for it twice still runs a single query.
+    """
+    user = db.scalar(select(User).where(User.user_id == user_id))
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+    return user
+
+
 @router.post("/", response_model=UserResponse)
 def create_user(user: UserCreate, db: Session = Depends(get_db)):
     """Create a new user account"""
     # Check if user already exists
-    existing = db.query(User).filter(User.user_id == user.user_id).first()
+    existing = db.scalar(select(User.id).where(User.user_id == user.user_id))
     if existing:
         raise HTTPException(status_code=400, detail="User already exists")
 
-    db_user = User(**user.dict())
+    db_user = User(**user.model_dump())
     db.add(db_user)
+    db.flush()  # INSERT ... RETURNING also loads the server-default timestamps
+    response = UserResponse.model_validate(db_user)
     db.commit()
-    db.refresh(db_user)
-    return db_user
+    return response
 
 
 @router.get("/{user_id}", response_model=UserResponse)
-def get_user(user_id: str, db: Session = Depends(get_db)):
+def get_user(user: User = Depends(get_user_or_404)):
     """Get user profile"""
-    user = db.query(User).filter(User.user_id == user_id).first()
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
     return user
 
 
 @router.patch("/{user_id}", response_model=UserResponse)
-def update_user(user_id: str, updates: UserUpdate, db: Session = Depends(get_db)):
+def update_user(
+    user_id: str,
+    updates: UserUpdate,
+    user: User = Depends(get_user_or_404),
+    db: Session = Depends(get_db)
+):
     """Update user preferences (including learning level)"""
-    user = db.query(User).filter(User.user_id == user_id).first()
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
-
     # Update only provided fields
     update_data = updates.dict(exclude_unset=True)
     for key, value in update_data.items():
         setattr(user, key, value)
 
+    # Serialize between flush and commit: the commit expires the instance,
+    # and reading it afterwards (or refreshing) would cost another SELECT
+    db.flush()
+    response = UserResponse.model_validate(user)
     db.commit()
-    db.refresh(user)
-    return user
+    invalidate_user_views(user_id)
+    return response
 
 
 @router.get("/{user_id}/progress")
 def get_user_progress(user_id: str, db: Session = Depends(get_db)):
-    """Get user's learning progress"""
-    user = db.query(User).filter(User.user_id == user_id).first()
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
+    """Get user's learning progress (cached for a few seconds)"""
+    body = progress_view_cache.get(user_id)
+    if body is None:
+        body = to_json(_build_user_progress(user_id, db))
+        progress_view_cache.set(user_id, body)
+    return Response(content=body, media_type="application/json")
 
-    progress = db.query(UserProgress).filter(UserProgress.user_id == user_id).all()
+
+def _build_user_progress(user_id: str, db: Session) -> dict:
+    """
+    Progress payload for get_user_progress
+
+    One round trip: the user's columns outer-joined with their progress rows
+    (a user without progress yields a single row of NULL progress columns).
+    """
+    rows = db.execute(
+        select(
+            User.learning_level,
+            User.background,
+            UserProgress.node_id,
+            UserProgress.completed,
+            UserProgress.quiz_score,
+            UserProgress.time_spent_minutes,
+            UserProgress.last_accessed
+        )
+        .outerjoin(UserProgress, UserProgress.user_id == User.user_id)
+        .where(User.user_id == user_id)
+    ).all()
+    if not rows:
+        raise HTTPException(status_code=404, detail="User not found")
 
     return {
         "user_id": user_id,
-        "learning_level": user.learning_level,
-        "background": user.background,
+        "learning_level": rows[0].learning_level,
+        "background": rows[0].background,
         "progress": [
             {
-                "node_id": p.node_id,
-                "completed": p.completed,
-                "quiz_score": p.quiz_score,
-                "time_spent_minutes": p.time_spent_minutes,
-                "last_accessed": p.last_accessed
+                "node_id": row.node_id,
+                "completed": row.completed,
+                "quiz_score": row.quiz_score,
+                "time_spent_minutes": row.time_spent_minutes,
+                "last_accessed": row.last_accessed
             }
-            for p in progress
+            for row in rows
+            if row.node_id is not None
         ]
     }
 
@@ -106,43 +158,37 @@ def get_user_dashboard(user_id: str, db: Session = Depends(get_db)):
     - Recent activity
     - Recommended next topics
     - Study streak
-    """
-    user = db.query(User).filter(User.user_id == user_id).first()
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
 
-    progress_service = ProgressService(db)
-    dashboard_data = progress_service.get_dashboard_data(user_id)
+    Cached for a few seconds; progress and profile writes invalidate it.
+    """
+    body = dashboard_view_cache.get(user_id)
+    if body is None:
+        progress_service = ProgressService(db)
+        dashboard_data = progress_service.get_dashboard_data(user_id)
 
-    if not dashboard_data:
-        raise HTTPException(status_code=404, detail="Dashboard data not available")
+        if not dashboard_data:
+            raise HTTPException(status_code=404, detail="Dashboard data not available")
 
-    return dashboard_data
+        body = to_json(dashboard_data)
+        dashboard_view_cache.set(user_id, body)
+    return Response(content=body, media_type="application/json")
 
 
 @router.patch("/{user_id}/profile")
-def update_user_profile(user_id: str, updates: dict, db: Session = Depends(get_db)):
+def update_user_profile(
+    user_id: str,
+    updates: ProfileUpdate,
+    user: User = Depends(get_user_or_404),
+    db: Session = Depends(get_db)
+):
     """Update user professional profile fields"""
-    user = db.query(User).filter(User.user_id == user_id).first()
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
-
-    # Allowed profile fields
-    allowed_fields = [
-        'name', 'email', 'phone', 'cv_url', 'linkedin_url',
-        'education_level', 'job_role', 'years_experience', 'target_roles'
-    ]
-
-    # Update only allowed fields
-    for key, value in updates.items():
-        if key in allowed_fields:
-            setattr(user, key, value)
-
-    db.commit()
-    db.refresh(user)
+    # Update only the profile fields present in the request
+    for key, value in updates.model_dump(exclude_unset=True).items():
+        setattr(user, key, value)
 
-    # Return updated profile with completion %
-    return {
+    # Flush runs the completion-% listener; build the response before commit expires the row
+    db.flush()
+    response = {
         "user_id": user.user_id,
         "name": user.name,
         "email": user.email,
@@ -150,14 +196,17 @@ def update_user_profile(user_id: str, updates: dict, db: Session = Depends(get_d
         "job_role": user.job_role,
         "profile_completion_percent": user.profile_completion_percent
     }
+    db.commit()
+    invalidate_user_views(user_id)
+
+    # Return updated profile with completion %
+    return response
 
 
 @router.post("/rate-content")
 def rate_content(rating: ContentRating, db: Session = Depends(get_db)):
     """Rate generated content (helps improve quality)"""
-    content = db.query(GeneratedContent).filter(
-        GeneratedContent.id == rating.generated_content_id
-    ).first()
+    content = db.get(GeneratedContent, rating.generated_content_id)
 
     if not content:
         raise HTTPException(status_code=404, detail="Content not found")
@@ -178,6 +227,7 @@ def rate_content(rating: ContentRating, db: Session = Depends(get_db)):
 def update_job_profile(
     user_id: str,
     job_data: JobProfileUpdate,
+    user: User = Depends(get_user_or_404),
     db: Session = Depends(get_db)
 ):
     """
@@ -192,60 +242,87 @@ def update_job_profile(
 
     RATE LIMIT: 1 path generation per user per 24 hours (testing/demo protection)
     """
-    user = db.query(User).filter(User.user_id == user_id).first()
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
-
     # ============ RATE LIMITING: Prevent API cost explosion ============
-    from datetime import datetime, timedelta
+    rate_limit_hours = LEARNING_PATH_RATE_LIMIT_HOURS
+    now = datetime.utcnow()
+    window = timedelta(hours=rate_limit_hours)
 
-    # Rate limit hours (configurable via environment variable)
-    rate_limit_hours = int(os.getenv("LEARNING_PATH_RATE_LIMIT_HOURS", "24"))
-
-    # Check if user generated a path in last N hours
-    recent_path = db.query(LearningPath).filter(
-        LearningPath.user_id == user_id,
-        LearningPath.created_at >= datetime.utcnow() - timedelta(hours=rate_limit_hours)
-    ).first()
+    # Claim the user's slot for the whole window in one statement shared by all workers
+    try:
+        claimed = claim_path_generation(db, user_id, now, now + window)
+        window_ends_at = None if claimed else db.scalar(
+            select(PathGenerationClaim.expires_at).where(PathGenerationClaim.user_id == user_id)
+        )
+        db.commit()
+    except SQLAlchemyError as e:
+        # Claim store unavailable (e.g. table not created yet): probe learning_paths instead
+        logger.warning("Path generation claim failed for user %s: %s", user_id, e)
+        db.rollback()
+        claimed = False
+        recent_path_created_at = db.scalar(
+            select(LearningPath.created_at).where(
+                LearningPath.user_id == user_id,
+                LearningPath.created_at >= now - window
+            ).limit(1)
+        )
+        window_ends_at = recent_path_created_at + window if recent_path_created_at else None
 
-    if recent_path:
-        hours_since = (datetime.utcnow() - recent_path.created_at).total_seconds() / 3600
-        hours_remaining = rate_limit_hours - hours_since
+    if window_ends_at:
+        hours_remaining = (window_ends_at - now).total_seconds() / 3600
         raise HTTPException(
             status_code=429,
             detail=f"Rate limit: You can generate 1 learning path per {rate_limit_hours} hours. Try again in {hours_remaining:.1f} hours. (Cost protection during testing)"
         )
 
+    try:
+        return _generate_job_profile_path(user_id, job_data, user, db)
+    except Exception:
+        if claimed:
+            # A failed generation doesn't use up the user's window
+            db.rollback()
+            release_path_generation(db, user_id)
+            db.commit()
+        raise
+
+
+def _generate_job_profile_path(
+    user_id: str,
+    job_data: JobProfileUpdate,
+    user: User,
+    db: Session
+) -> dict:
+    """Job analysis and path generation for update_job_profile, once the slot is claimed"""
     # Update job fields
     user.job_title = job_data.job_title
     user.job_description = job_data.job_description
     user.job_seniority = job_data.job_seniority
     user.firm = job_data.firm
 
-    # ============ DEBUG: Print User Input ============
-    print("\n" + "="*80)
-    print("📥 USER INPUT RECEIVED")
-    print("="*80)
-    print(f"User ID: {user_id}")
-    print(f"Job Title: {job_data.job_title or 'Not provided'}")
-    print(f"Seniority: {job_data.job_seniority or 'Not specified'}")
-    print(f"Firm: {job_data.firm or 'Not provided'}")
-    print(f"\nJob Description ({len(job_data.job_description)} characters):")
-    print("-" * 80)
-    print(job_data.job_description)
-    print("-" * 80)
-    print("="*80 + "\n")
+    # Lazy %-formatting: costs nothing unless DEBUG logging is enabled
+    logger.debug(
+        "Job profile input user_id=%s title=%s seniority=%s firm=%s description_chars=%d",
+        user_id, job_data.job_title, job_data.job_seniority, job_data.firm,
+        len(job_data.job_description)
+    )
 
     # Analyze job to extract role type (using GPT-4o-mini)
-    print(f"🔍 Analyzing job description for user {user_id}...")
+    logger.info("Analyzing job description for user %s", user_id)
     job_profile = learning_path_service.analyze_job_description(job_data.job_description)
     user.job_role_type = job_profile.get('role_type', 'other')
 
+    # Snapshot the response fields before commit expires the row
+    db.flush()
+    user_summary = {
+        "user_id": user.user_id,
+        "job_title": user.job_title,
+        "job_role_type": user.job_role_type,
+        "profile_completion_percent": user.profile_completion_percent
+    }
     db.commit()
-    db.refresh(user)
+    invalidate_user_views(user_id)
 
     # Generate learning path (Tier 3 coverage check included)
-    print(f"Generating learning path for {user.job_role_type}...")
+    logger.info("Generating learning path for %s", user_summary["job_role_type"])
     try:
         learning_path = learning_path_service.generate_path_for_job(
             job_description=job_data.job_description,
@@ -253,17 +330,12 @@ def update_job_profile(
             db=db
         )
     except Exception as e:
-        print(f"Error generating learning path: {e}")
+        logger.error("Error generating learning path for user %s: %s", user_id, e)
         raise HTTPException(status_code=500, detail=f"Failed to generate learning path: {str(e)}")
 
     return {
         "message": "Job profile updated and learning path generated",
-        "user": {
-            "user_id": user.user_id,
-            "job_title": user.job_title,
-            "job_role_type": user.job_role_type,
-            "profile_completion_percent": user.profile_completion_percent
-        },
+        "user": user_summary,
         "learning_path": {
             "id": learning_path.id,
             "role_type": learning_path.role_type,
@@ -276,21 +348,24 @@ def update_job_profile(
 
 
 @router.get("/{user_id}/learning-path", response_model=LearningPathResponse)
-def get_learning_path(user_id: str, db: Session = Depends(get_db)):
+def get_learning_path(
+    user_id: str,
+    user: User = Depends(get_user_or_404),
+    db: Session = Depends(get_db)
+):
     """
     Get user's current learning path
 
     Returns the most recent learning path generated for this user.
     If no path exists, returns 404.
     """
-    user = db.query(User).filter(User.user_id == user_id).first()
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
-
     # Get most recent learning path
-    learning_path = db.query(LearningPath).filter(
-        LearningPath.user_id == user_id
-    ).order_by(LearningPath.created_at.desc()).first()
+    learning_path = db.scalar(
+        select(LearningPath)
+        .where(LearningPath.user_id == user_id)
+        .order_by(LearningPath.created_at.desc())
+        .limit(1)
+    )
 
     if not learning_path:
         raise HTTPException(
@@ -305,7 +380,8 @@ def get_learning_path(user_id: str, db: Session = Depends(get_db)):
 def delete_learning_path(
     user_id: str,
     db: Session = Depends(get_db),
-    _admin: bool = Depends(verify_admin_token)
+    _admin: bool = Depends(verify_admin_token),
+    user: User = Depends(get_user_or_404)
 ):
     """
     [ADMIN ONLY] Delete user's learning path to reset rate limit
@@ -313,16 +389,14 @@ def delete_learning_path(
     Requires X-Admin-Token header for authentication.
     Users must email admin to request learning path deletion.
     """
-    user = db.query(User).filter(User.user_id == user_id).first()
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
-
     # Delete all learning paths for this user
     deleted_count = db.query(LearningPath).filter(
         LearningPath.user_id == user_id
     ).delete()
+    release_path_generation(db, user_id)
 
     db.commit()
+    invalidate_user_views(user_id)
 
     return {
         "message": "Learning path deleted successfully",
@@ -1336,7 +1336,7 @@ Prioritize:
         node_id = first_topic.get('node_id')
 
         if node_id:
-            return db.query(Node).filter(Node.id == node_id).first()
+            return db.get(Node, node_id)
 
         return None
 
@@ -1,28 +1,20 @@
-from openai import OpenAI
+from functools import cached_property
+from importlib.util import find_spec
 from typing import List, Dict, Any, Optional
 from app.config.settings import settings
 from app.utils.cost_tracker import cost_tracker
 import json
 
-try:
-    from anthropic import Anthropic
-    ANTHROPIC_AVAILABLE = True
-except ImportError:
-    ANTHROPIC_AVAILABLE = False
+# Checked without importing; the SDK itself is only imported when first used
+ANTHROPIC_AVAILABLE = find_spec("anthropic") is not None
 
 
 class LLMService:
     """Handles LLM-powered content generation"""
 
     def __init__(self):
-        self.client = OpenAI(api_key=settings.OPENAI_API_KEY)
         self.model = settings.OPENAI_MODEL
-
-        # Initialize Claude client if API key is available
-        self.claude_client = None
         self.claude_model = settings.ANTHROPIC_MODEL
-        if ANTHROPIC_AVAILABLE and settings.ANTHROPIC_API_KEY:
-            self.claude_client = Anthropic(api_key=settings.ANTHROPIC_API_KEY)
 
         # Define audience profiles for difficulty-aware prompting
         self.difficulty_profiles = {
@@ -58,6 +50,20 @@ class LLMService:
             }
         }
 
+    @cached_property
+    def client(self):
+        """OpenAI client, created (and the SDK imported) on first use"""
+        from openai import OpenAI
+        return OpenAI(api_key=settings.OPENAI_API_KEY)
+
+    @cached_property
+    def claude_client(self):
+        """Claude client if an API key is configured, else None"""
+        if not (ANTHROPIC_AVAILABLE and settings.ANTHROPIC_API_KEY):
+            return None
+        from anthropic import Anthropic
+        return Anthropic(api_key=settings.ANTHROPIC_API_KEY)
+
     def _get_difficulty_context(self, difficulty: int) -> str:
         """Get audience-appropriate context for prompts"""
         profile = self.difficulty_profiles.get(difficulty, self.difficulty_profiles[3])
@@ -10,6 +10,22 @@ from sqlalchemy.orm import Session
 from sqlalchemy import func
 
 from app.models.database import User, UserProgress, UserCompetency, StudySession, Node
+from app.middleware.auth import invalidate_cached_user
+from app.utils.ttl_cache import TTLCache
+
+
+# Serialized read-mostly per-user payloads (rendered on every page load), keyed
+# by user_id. Writes invalidate them in this process only; the short TTL bounds
+# how long another worker can serve a view from before a write.
+progress_view_cache = TTLCache(maxsize=10_000, ttl=5)
+dashboard_view_cache = TTLCache(maxsize=10_000, ttl=5)
+
+
+def invalidate_user_views(user_id: str) -> None:
+    """Drop a user's cached progress/dashboard (and auth row) after their data changes"""
+    progress_view_cache.pop(user_id, None)
+    dashboard_view_cache.pop(user_id, None)
+    invalidate_cached_user(user_id)
 
 
 class ProgressService:
@@ -55,7 +71,7 @@ class ProgressService:
             'recent_activity': recent_activity,
             'recommended_topics': recommended_topics,
             'study_streak_days': study_streak,
-            'last_active': user.last_active.isoformat() if user.last_active else None
+            'last_active': user.last_active
         }
 
     def _calculate_interview_readiness(self, user: User) -> int:
@@ -83,7 +99,7 @@ class ProgressService:
 
         categories_with_progress = set()
         for progress in user_progress:
-            node = self.db.query(Node).filter(Node.id == progress.node_id).first()
+            node = self.db.get(Node, progress.node_id)
             if node and node.category:
                 categories_with_progress.add(node.category)
 
@@ -168,14 +184,14 @@ class ProgressService:
 
         activity = []
         for progress in recent:
-            node = self.db.query(Node).filter(Node.id == progress.node_id).first()
+            node = self.db.get(Node, progress.node_id)
             if node:
                 activity.append({
                     'node_id': node.id,
                     'title': node.title,
                     'category': node.category,
                     'completion': progress.completed,
-                    'last_accessed': progress.last_accessed.isoformat() if progress.last_accessed else None
+                    'last_accessed': progress.last_accessed
                 })
 
         return activity
@@ -290,6 +306,7 @@ class ProgressService:
             competency.level = competency.level_name  # Use property to calculate level
 
         self.db.commit()
+        invalidate_user_views(user_id)
 
     def log_study_session(self, user_id: str, node_id: int, duration_seconds: int):
         """Log a study session"""
@@ -307,3 +324,4 @@ class ProgressService:
         if user:
             user.last_active = datetime.utcnow()
             self.db.commit()
+        invalidate_user_views(user_id)
@@ -1,25 +1,61 @@
-import pinecone
-from pinecone import Pinecone, ServerlessSpec
-from openai import OpenAI
 from typing import List, Dict, Any, Optional
 from app.config.settings import settings
+from app.utils.ttl_cache import TTLCache
 import hashlib
+import threading
+
+
+# Search-query embeddings keyed by a digest of the normalized query text
+_QUERY_EMBEDDING_CACHE = TTLCache(maxsize=4096, ttl=24 * 3600)
 
 
 class VectorStoreService:
-    """Handles all vector database operations with Pinecone"""
+    """
+    Handles all vector database operations with Pinecone
+
+    The Pinecone and OpenAI clients (and their heavy imports) are created on
+    first use, so importing this module doesn't open network connections.
+    """
 
     def __init__(self):
-        self.pc = None
-        self.openai_client = None
         self.index_name = settings.PINECONE_INDEX_NAME
-        self.index = None
-        self.available = False
-        self._initialize_index()
+        self._pc = None
+        self._openai_client = None
+        self._index = None
+        self._available = None  # Unknown until the first call initializes the clients
+        self._init_lock = threading.Lock()
+
+    def _ensure_initialized(self):
+        """Connect to Pinecone/OpenAI once, on first use"""
+        if self._available is None:
+            with self._init_lock:
+                if self._available is None:
+                    self._initialize_index()
+
+    @property
+    def available(self) -> bool:
+        self._ensure_initialized()
+        return self._available
+
+    @property
+    def pc(self):
+        self._ensure_initialized()
+        return self._pc
+
+    @property
+    def openai_client(self):
+        self._ensure_initialized()
+        return self._openai_client
+
+    @property
+    def index(self):
+        self._ensure_initialized()
+        return self._index
 
     def _create_openai_client_with_timeout(self):
         """Create OpenAI client with timeout settings"""
         import httpx
+        from openai import OpenAI
         return OpenAI(
             api_key=settings.OPENAI_API_KEY,
             timeout=httpx.Timeout(60.0, connect=10.0),  # 60s total, 10s connect
@@ -29,15 +65,17 @@ class VectorStoreService:
     def _initialize_index(self):
         """Create index if it doesn't exist and connect to it"""
         try:
-            self.pc = Pinecone(api_key=settings.PINECONE_API_KEY)
-            self.openai_client = self._create_openai_client_with_timeout()
+            from pinecone import Pinecone, ServerlessSpec
+
+            self._pc = Pinecone(api_key=settings.PINECONE_API_KEY)
+            self._openai_client = self._create_openai_client_with_timeout()
 
             # Check if index exists
-            existing_indexes = [idx.name for idx in self.pc.list_indexes()]
+            existing_indexes = [idx.name for idx in self._pc.list_indexes()]
 
             if self.index_name not in existing_indexes:
                 # Create new index
-                self.pc.create_index(
+                self._pc.create_index(
                     name=self.index_name,
                     dimension=settings.EMBEDDING_DIMENSION,
                     metric='cosine',
@@ -49,14 +87,14 @@ class VectorStoreService:
                 print(f"Created new Pinecone index: {self.index_name}")
 
             # Connect to index
-            self.index = self.pc.Index(self.index_name)
-            self.available = True
+            self._index = self._pc.Index(self.index_name)
+            self._available = True
             print(f"Connected to Pinecone index: {self.index_name}")
 
         except Exception as e:
             print(f"Error initializing Pinecone index: {e}")
             print("Vector store will not be available - content generation will be disabled")
-            self.available = False
+            self._available = False
 
     def generate_embedding(self, text: str) -> List[float]:
         """Generate embedding vector for text using OpenAI"""
@@ -72,6 +110,36 @@ class VectorStoreService:
             print(f"Error generating embedding: {e}")
             raise
 
+    def query_embedding(self, query: str) -> List[float]:
+        """
+        Embedding for a search query, cached by its whitespace-normalized text
+
+        Embeddings are deterministic, so repeated searches (the same node's
+        title/description, popular search terms) skip the OpenAI round-trip.
+        """
+        normalized = " ".join(query.split())
+        cache_key = hashlib.blake2b(normalized.encode(), digest_size=16).digest()
+        embedding = _QUERY_EMBEDDING_CACHE.get(cache_key)
+        if embedding is None:
+            embedding = self.generate_embedding(normalized)
+            if embedding:
+                _QUERY_EMBEDDING_CACHE.set(cache_key, embedding)
+        return embedding
+
+    def generate_embeddings(self, texts: List[str]) -> List[List[float]]:
+        """Generate embedding vectors for many texts in a single OpenAI request"""
+        if not self.available or not texts:
+            return []
+        try:
+            response = self.openai_client.embeddings.create(
+                model=settings.EMBEDDING_MODEL,
+                input=texts
+            )
+            return [item.embedding for item in response.data]
+        except Exception as e:
+            print(f"Error generating embeddings: {e}")
+            raise
+
     def generate_vector_id(self, node_id: int, chunk_index: int) -> str:
         """Generate unique vector ID"""
         return f"node_{node_id}_chunk_{chunk_index}"
@@ -217,7 +285,8 @@ class VectorStoreService:
         node_id: Optional[int] = None,
         top_k: int = 5,
         filter_metadata: Optional[Dict[str, Any]] = None,
-        namespace: Optional[str] = None
+        namespace: Optional[str] = None,
+        category: Optional[str] = None
     ) -> List[Dict[str, Any]]:
         """
         Search for relevant content chunks
@@ -228,6 +297,7 @@ class VectorStoreService:
             top_k: Number of results to return
             filter_metadata: Additional Pinecone filters
             namespace: Optional namespace to search (default: searches default namespace)
+            category: Optional filter by node category (applied by Pinecone, so top_k stays full)
 
         Returns:
             List of matches with text and metadata
@@ -235,13 +305,15 @@ class VectorStoreService:
         if not self.available:
             return []
 
-        # Generate query embedding
-        query_embedding = self.generate_embedding(query)
+        # Generate query embedding (cached per query text)
+        query_embedding = self.query_embedding(query)
 
         # Build filter
         filter_dict = {}
         if node_id:
             filter_dict['node_id'] = node_id
+        if category:
+            filter_dict['category'] = {'$eq': category}
         if filter_metadata:
             filter_dict.update(filter_metadata)
 
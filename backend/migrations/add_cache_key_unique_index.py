@@ -0,0 +1,71 @@
+"""
+Migration: Unique index on the generated_content cache key
+
+Concurrent cache misses for the same content used to insert one row each.
+query_content now inserts with ON CONFLICT DO NOTHING against a partial
+unique index over (node_id, content_type, role template | job hash |
+difficulty, content_version) for valid rows. Existing duplicates are
+invalidated first, keeping the most accessed row of each key.
+
+The index is built with CREATE INDEX CONCURRENTLY so writers are not
+blocked during rollout (requires autocommit, so no wrapping transaction).
+
+Run with: cd backend && python -m migrations.add_cache_key_unique_index
+"""
+
+from sqlalchemy import text
+from app.models.database import engine
+
+
+CACHE_KEY = "COALESCE(role_template_id, job_profile_hash, CAST(difficulty_level AS VARCHAR))"
+
+UPGRADE_STATEMENTS = [
+    f"""UPDATE generated_content SET is_valid = false
+    WHERE id IN (
+        SELECT id FROM (
+            SELECT id, ROW_NUMBER() OVER (
+                PARTITION BY node_id, content_type, {CACHE_KEY}, content_version
+                ORDER BY access_count DESC NULLS LAST, id
+            ) AS duplicate_rank
+            FROM generated_content
+            WHERE is_valid = true
+        ) ranked
+        WHERE duplicate_rank > 1
+    )""",
+    "CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS ux_gc_cache_key "
+    f"ON generated_content (node_id, content_type, ({CACHE_KEY}), content_version) "
+    "WHERE is_valid = true",
+]
+
+DOWNGRADE_STATEMENTS = [
+    "DROP INDEX CONCURRENTLY IF EXISTS ux_gc_cache_key",
+]
+
+
+def _run(statements):
+    # CONCURRENTLY cannot run inside a transaction block
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        for sql in statements:
+            result = conn.execute(text(sql))
+            if sql.startswith("UPDATE"):
+                print(f"✓ Invalidated {result.rowcount} duplicate cache rows")
+            else:
+                print(f"✓ {sql.split(' ON ')[0]}")
+
+
+def upgrade():
+    """Invalidate duplicate cache rows and add the unique cache-key index"""
+    print("Adding cache key unique index...")
+    _run(UPGRADE_STATEMENTS)
+
+
+def downgrade():
+    """Drop the unique cache-key index"""
+    print("Removing cache key unique index...")
+    _run(DOWNGRADE_STATEMENTS)
+
+
+if __name__ == "__main__":
+    print("Running migration: add_cache_key_unique_index")
+    upgrade()
+    print("Migration complete!")
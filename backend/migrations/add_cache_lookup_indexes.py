@@ -0,0 +1,63 @@
+"""
+Migration: Add composite indexes for the generated_content cache lookup
+
+Replaces the single-column content_type/difficulty_level indexes with one
+composite index matching the cache lookup filter, and adds a per
+(user, node) index on user_progress.
+
+Indexes are built with CREATE INDEX CONCURRENTLY so writers are not
+blocked during rollout (requires autocommit, so no wrapping transaction).
+
+Run with: cd backend && python -m migrations.add_cache_lookup_indexes
+"""
+
+from sqlalchemy import text
+from app.models.database import engine
+
+
+UPGRADE_STATEMENTS = [
+    "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_gc_lookup "
+    "ON generated_content (node_id, content_type, difficulty_level, is_valid)",
+    "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_gc_valid_created "
+    "ON generated_content (is_valid, created_at)",
+    "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_userprogress_user_node "
+    "ON user_progress (user_id, node_id)",
+    "DROP INDEX CONCURRENTLY IF EXISTS ix_generated_content_content_type",
+    "DROP INDEX CONCURRENTLY IF EXISTS ix_generated_content_difficulty_level",
+]
+
+DOWNGRADE_STATEMENTS = [
+    "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_generated_content_content_type "
+    "ON generated_content (content_type)",
+    "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_generated_content_difficulty_level "
+    "ON generated_content (difficulty_level)",
+    "DROP INDEX CONCURRENTLY IF EXISTS ix_gc_lookup",
+    "DROP INDEX CONCURRENTLY IF EXISTS ix_gc_valid_created",
+    "DROP INDEX CONCURRENTLY IF EXISTS ix_userprogress_user_node",
+]
+
+
+def _run(statements):
+    # CONCURRENTLY cannot run inside a transaction block
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        for sql in statements:
+            conn.execute(text(sql))
+            print(f"✓ {sql.split(' ON ')[0]}")
+
+
+def upgrade():
+    """Create composite cache-lookup and progress indexes"""
+    print("Adding composite indexes...")
+    _run(UPGRADE_STATEMENTS)
+
+
+def downgrade():
+    """Restore single-column indexes and drop the composite ones"""
+    print("Removing composite indexes...")
+    _run(DOWNGRADE_STATEMENTS)
+
+
+if __name__ == "__main__":
+    print("Running migration: add_cache_lookup_indexes")
+    upgrade()
+    print("Migration complete!")
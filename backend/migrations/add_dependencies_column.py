@@ -4,17 +4,15 @@ Migration: Add dependencies column to learning_paths table
 This migration adds a JSON column to store topic dependencies (prerequisite relationships)
 in the learning paths.
 
-Run with: python -m backend.migrations.add_dependencies_column
+Run with: cd backend && python -m migrations.add_dependencies_column
 """
 
-from sqlalchemy import create_engine, text
-from backend.app.core.config import settings
+from sqlalchemy import text
+from app.models.database import engine
 
 
 def upgrade():
     """Add dependencies column to learning_paths table"""
-    engine = create_engine(settings.DATABASE_URL)
-
     with engine.connect() as conn:
         # Check if column already exists
         result = conn.execute(text("""
@@ -38,8 +36,6 @@ def upgrade():
 
 def downgrade():
     """Remove dependencies column from learning_paths table"""
-    engine = create_engine(settings.DATABASE_URL)
-
     with engine.connect() as conn:
         print("Removing dependencies column from learning_paths table...")
         conn.execute(text("""
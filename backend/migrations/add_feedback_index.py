@@ -0,0 +1,41 @@
+"""
+Migration: Partial index for the admin feedback listing
+
+GET /api/admin/feedback reads the newest rated generated_content rows
+(WHERE rating IS NOT NULL ORDER BY created_at DESC LIMIT 50); a partial
+descending index turns that into a bounded index scan instead of a sort.
+
+Built with CREATE INDEX CONCURRENTLY (requires autocommit).
+
+Run with: cd backend && python -m migrations.add_feedback_index
+"""
+
+from sqlalchemy import text
+from app.models.database import engine
+
+
+def _run(sql):
+    # CONCURRENTLY cannot run inside a transaction block
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        conn.execute(text(sql))
+
+
+def upgrade():
+    """Create the rated-content index"""
+    _run(
+        "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_gc_rated_created "
+        "ON generated_content (created_at DESC) WHERE rating IS NOT NULL"
+    )
+    print("✓ Created ix_gc_rated_created")
+
+
+def downgrade():
+    """Drop the rated-content index"""
+    _run("DROP INDEX CONCURRENTLY IF EXISTS ix_gc_rated_created")
+    print("✓ Dropped ix_gc_rated_created")
+
+
+if __name__ == "__main__":
+    print("Running migration: add_feedback_index")
+    upgrade()
+    print("Migration complete!")
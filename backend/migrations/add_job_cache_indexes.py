@@ -0,0 +1,68 @@
+"""
+Migration: Composite indexes for job-based content cache lookups
+
+query_content looks cached rows up by (node_id, content_type,
+role_template_id | job_profile_hash, content_version). The single-column
+role_template_id/job_profile_hash indexes are replaced with partial
+composite indexes matching those filters, and a check constraint keeps the
+two cache keys mutually exclusive.
+
+Indexes are built CONCURRENTLY (autocommit); the constraint is added
+NOT VALID and validated separately so writers are not blocked.
+
+Run with: cd backend && python -m migrations.add_job_cache_indexes
+"""
+
+from sqlalchemy import text
+from app.models.database import engine
+
+
+UPGRADE_STATEMENTS = [
+    "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_gc_role_lookup "
+    "ON generated_content (node_id, content_type, role_template_id, content_version) "
+    "WHERE role_template_id IS NOT NULL",
+    "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_gc_hash_lookup "
+    "ON generated_content (node_id, content_type, job_profile_hash, content_version) "
+    "WHERE job_profile_hash IS NOT NULL",
+    "DROP INDEX CONCURRENTLY IF EXISTS ix_generated_content_role_template_id",
+    "DROP INDEX CONCURRENTLY IF EXISTS ix_generated_content_job_profile_hash",
+    "ALTER TABLE generated_content ADD CONSTRAINT ck_gc_single_job_key "
+    "CHECK (role_template_id IS NULL OR job_profile_hash IS NULL) NOT VALID",
+    "ALTER TABLE generated_content VALIDATE CONSTRAINT ck_gc_single_job_key",
+]
+
+DOWNGRADE_STATEMENTS = [
+    "ALTER TABLE generated_content DROP CONSTRAINT IF EXISTS ck_gc_single_job_key",
+    "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_generated_content_role_template_id "
+    "ON generated_content (role_template_id)",
+    "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_generated_content_job_profile_hash "
+    "ON generated_content (job_profile_hash)",
+    "DROP INDEX CONCURRENTLY IF EXISTS ix_gc_role_lookup",
+    "DROP INDEX CONCURRENTLY IF EXISTS ix_gc_hash_lookup",
+]
+
+
+def _run(statements):
+    # CONCURRENTLY cannot run inside a transaction block
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        for sql in statements:
+            conn.execute(text(sql))
+            print(f"✓ {sql.split(' ON ')[0]}")
+
+
+def upgrade():
+    """Create job-cache lookup indexes and the single-key constraint"""
+    print("Adding job cache indexes...")
+    _run(UPGRADE_STATEMENTS)
+
+
+def downgrade():
+    """Restore single-column indexes and drop the composite ones"""
+    print("Removing job cache indexes...")
+    _run(DOWNGRADE_STATEMENTS)
+
+
+if __name__ == "__main__":
+    print("Running migration: add_job_cache_indexes")
+    upgrade()
+    print("Migration complete!")
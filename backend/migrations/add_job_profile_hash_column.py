@@ -0,0 +1,44 @@
+"""
+Migration: Store the custom-job cache key on users
+
+query_content used to md5 the user's job description on every request to
+build the job_profile_hash cache key. The key is now stored in
+users.job_profile_hash, set whenever job_description is written. Existing
+rows are backfilled in SQL with the same md5 prefix, so already-cached
+content keeps matching.
+
+Run with: cd backend && python -m migrations.add_job_profile_hash_column
+"""
+
+from sqlalchemy import text
+from app.models.database import engine
+
+
+# Mirrors job_description_hash: first 16 hex chars of md5(job_description)
+BACKFILL_SQL = """
+    UPDATE users SET job_profile_hash = LEFT(md5(job_description), 16)
+    WHERE job_description IS NOT NULL AND job_description <> ''
+"""
+
+
+def upgrade():
+    """Add and backfill users.job_profile_hash"""
+    with engine.begin() as conn:
+        conn.execute(text(
+            "ALTER TABLE users ADD COLUMN IF NOT EXISTS job_profile_hash VARCHAR(16)"
+        ))
+        result = conn.execute(text(BACKFILL_SQL))
+        print(f"✓ Backfilled job_profile_hash for {result.rowcount} users")
+
+
+def downgrade():
+    """Drop users.job_profile_hash"""
+    with engine.begin() as conn:
+        conn.execute(text("ALTER TABLE users DROP COLUMN IF EXISTS job_profile_hash"))
+        print("✓ Dropped job_profile_hash")
+
+
+if __name__ == "__main__":
+    print("Running migration: add_job_profile_hash_column")
+    upgrade()
+    print("Migration complete!")
@@ -0,0 +1,58 @@
+"""
+Migration: Create path_generation_claims and seed it from learning_paths
+
+update_job_profile rate-limits path generation with one claim row per user
+instead of querying learning_paths on every request. Users who generated a
+path within the current window get a claim ending where that window ends,
+so the limit carries over; re-running is safe.
+
+Run with: cd backend && python -m migrations.add_path_generation_claims
+"""
+
+import os
+
+from sqlalchemy import text
+from app.models.database import engine
+
+
+# Same setting as app.routes.users (importing it would pull in the LLM services)
+LEARNING_PATH_RATE_LIMIT_HOURS = int(os.getenv("LEARNING_PATH_RATE_LIMIT_HOURS", "24"))
+
+CREATE_SQL = """
+    CREATE TABLE IF NOT EXISTS path_generation_claims (
+        user_id VARCHAR(100) PRIMARY KEY REFERENCES users (user_id) ON DELETE CASCADE,
+        expires_at TIMESTAMP NOT NULL
+    )
+"""
+
+SEED_SQL = f"""
+    INSERT INTO path_generation_claims (user_id, expires_at)
+    SELECT user_id, MAX(created_at) + INTERVAL '{LEARNING_PATH_RATE_LIMIT_HOURS} hours'
+    FROM learning_paths
+    WHERE user_id IS NOT NULL
+    GROUP BY user_id
+    HAVING MAX(created_at) + INTERVAL '{LEARNING_PATH_RATE_LIMIT_HOURS} hours'
+        > TIMEZONE('utc', CURRENT_TIMESTAMP)
+    ON CONFLICT (user_id) DO NOTHING
+"""
+
+
+def upgrade():
+    """Create path_generation_claims and seed live windows from learning_paths"""
+    with engine.begin() as conn:
+        conn.execute(text(CREATE_SQL))
+        result = conn.execute(text(SEED_SQL))
+    print(f"✓ Seeded {result.rowcount} path generation claims")
+
+
+def downgrade():
+    """Drop path_generation_claims"""
+    with engine.begin() as conn:
+        conn.execute(text("DROP TABLE IF EXISTS path_generation_claims"))
+    print("✓ Dropped path_generation_claims")
+
+
+if __name__ == "__main__":
+    print("Running migration: add_path_generation_claims")
+    upgrade()
+    print("Migration complete!")
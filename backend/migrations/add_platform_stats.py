@@ -0,0 +1,50 @@
+"""
+Migration: Create and seed the platform_stats counters table
+
+platform_stats holds gen_count and gen_queries_total (generated_content row
+count and SUM(access_count)), kept current by ORM insert/delete events and
+the content-hits flush. This seeds them from the current table contents;
+re-running recounts.
+
+Run with: cd backend && python -m migrations.add_platform_stats
+"""
+
+from sqlalchemy import text
+from app.models.database import engine
+
+
+CREATE_SQL = """
+    CREATE TABLE IF NOT EXISTS platform_stats (
+        key VARCHAR(50) PRIMARY KEY,
+        value BIGINT NOT NULL DEFAULT 0
+    )
+"""
+
+SEED_SQL = """
+    INSERT INTO platform_stats (key, value)
+    SELECT 'gen_count', COUNT(*) FROM generated_content
+    UNION ALL
+    SELECT 'gen_queries_total', COALESCE(SUM(access_count), 0) FROM generated_content
+    ON CONFLICT (key) DO UPDATE SET value = EXCLUDED.value
+"""
+
+
+def upgrade():
+    """Create platform_stats and seed it from generated_content"""
+    with engine.begin() as conn:
+        conn.execute(text(CREATE_SQL))
+        conn.execute(text(SEED_SQL))
+    print("✓ Seeded platform_stats")
+
+
+def downgrade():
+    """Drop platform_stats"""
+    with engine.begin() as conn:
+        conn.execute(text("DROP TABLE IF EXISTS platform_stats"))
+    print("✓ Dropped platform_stats")
+
+
+if __name__ == "__main__":
+    print("Running migration: add_platform_stats")
+    upgrade()
+    print("Migration complete!")
@@ -0,0 +1,53 @@
+"""
+Migration: Add a denormalized profile_completion_percent column to users
+
+The value used to be computed on every attribute access; it is now stored
+and refreshed by a before_insert/before_update listener on User. Existing
+rows are backfilled with the same scoring in SQL.
+
+Run with: cd backend && python -m migrations.add_profile_completion_column
+"""
+
+from sqlalchemy import text
+from app.models.database import engine
+
+
+# Mirrors User.compute_profile_completion: 25 per core field, +5 per bonus field, capped at 100
+BACKFILL_SQL = """
+    UPDATE users SET profile_completion_percent = LEAST(
+        25 * ((COALESCE(name, '') <> '')::int
+              + (COALESCE(email, '') <> '')::int
+              + (COALESCE(education_level, '') <> '')::int
+              + (COALESCE(length(job_description), 0) > 20)::int)
+        + 5 * ((COALESCE(cv_url, '') <> '')::int
+               + (COALESCE(linkedin_url, '') <> '')::int
+               + (COALESCE(job_role, '') <> '')::int
+               + (CASE WHEN jsonb_typeof(target_roles::jsonb) = 'array'
+                       THEN jsonb_array_length(target_roles::jsonb) > 0
+                       ELSE false END)::int),
+        100
+    )
+"""
+
+
+def upgrade():
+    """Add and backfill profile_completion_percent"""
+    with engine.begin() as conn:
+        conn.execute(text(
+            "ALTER TABLE users ADD COLUMN IF NOT EXISTS profile_completion_percent INTEGER DEFAULT 0"
+        ))
+        result = conn.execute(text(BACKFILL_SQL))
+        print(f"✓ Backfilled profile_completion_percent for {result.rowcount} users")
+
+
+def downgrade():
+    """Drop profile_completion_percent"""
+    with engine.begin() as conn:
+        conn.execute(text("ALTER TABLE users DROP COLUMN IF EXISTS profile_completion_percent"))
+        print("✓ Dropped profile_completion_percent")
+
+
+if __name__ == "__main__":
+    print("Running migration: add_profile_completion_column")
+    upgrade()
+    print("Migration complete!")
@@ -0,0 +1,38 @@
+"""
+Migration: Add a (topic_name, access_count) index on section_contents
+
+Lets the admin stats top-topics aggregation run as an index-only scan.
+Built with CREATE INDEX CONCURRENTLY (requires autocommit).
+
+Run with: cd backend && python -m migrations.add_section_access_index
+"""
+
+from sqlalchemy import text
+from app.models.database import engine
+
+
+def _run(sql):
+    # CONCURRENTLY cannot run inside a transaction block
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        conn.execute(text(sql))
+
+
+def upgrade():
+    """Create the per-topic access index"""
+    _run(
+        "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_section_topic_access "
+        "ON section_contents (topic_name, access_count)"
+    )
+    print("✓ Created ix_section_topic_access")
+
+
+def downgrade():
+    """Drop the per-topic access index"""
+    _run("DROP INDEX CONCURRENTLY IF EXISTS ix_section_topic_access")
+    print("✓ Dropped ix_section_topic_access")
+
+
+if __name__ == "__main__":
+    print("Running migration: add_section_access_index")
+    upgrade()
+    print("Migration complete!")
@@ -0,0 +1,57 @@
+"""
+Migration: Add indexes backing the admin usage stats aggregations
+
+- users.last_active for the active-users-in-24h count
+- generated_content (content_type, access_count) for per-type access totals
+- partial generated_content (difficulty_level, rating) WHERE rating IS NOT NULL
+  for average rating by difficulty
+
+Built with CREATE INDEX CONCURRENTLY (requires autocommit).
+
+Run with: cd backend && python -m migrations.add_stats_indexes
+"""
+
+from sqlalchemy import text
+from app.models.database import engine
+
+
+UPGRADE_STATEMENTS = [
+    "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_users_last_active "
+    "ON users (last_active)",
+    "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_gc_type_access "
+    "ON generated_content (content_type, access_count)",
+    "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_gc_rating_diff "
+    "ON generated_content (difficulty_level, rating) WHERE rating IS NOT NULL",
+]
+
+DOWNGRADE_STATEMENTS = [
+    "DROP INDEX CONCURRENTLY IF EXISTS ix_users_last_active",
+    "DROP INDEX CONCURRENTLY IF EXISTS ix_gc_type_access",
+    "DROP INDEX CONCURRENTLY IF EXISTS ix_gc_rating_diff",
+]
+
+
+def _run(statements):
+    # CONCURRENTLY cannot run inside a transaction block
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        for sql in statements:
+            conn.execute(text(sql))
+            print(f"✓ {sql.split(' ON ')[0]}")
+
+
+def upgrade():
+    """Create stats indexes"""
+    print("Adding stats indexes...")
+    _run(UPGRADE_STATEMENTS)
+
+
+def downgrade():
+    """Drop stats indexes"""
+    print("Removing stats indexes...")
+    _run(DOWNGRADE_STATEMENTS)
+
+
+if __name__ == "__main__":
+    print("Running migration: add_stats_indexes")
+    upgrade()
+    print("Migration complete!")
@@ -0,0 +1,34 @@
+"""
+Migration: Create materialized views for the admin usage stats
+
+mv_top_topics (top 10 section topics by access count) and
+mv_content_type_stats (access totals per generated content type) are read
+by GET /api/admin/stats and refreshed concurrently in the background
+(STATS_VIEW_REFRESH_SECONDS). New databases get them from init_db.
+
+Run with: cd backend && python -m migrations.add_stats_materialized_views
+"""
+
+from sqlalchemy import text
+from app.models.database import engine, STATS_VIEWS, create_stats_views
+
+
+def upgrade():
+    """Create the stats materialized views and their unique indexes"""
+    with engine.begin() as conn:
+        create_stats_views(conn)
+    print(f"✓ Created {', '.join(STATS_VIEWS)}")
+
+
+def downgrade():
+    """Drop the stats materialized views"""
+    with engine.begin() as conn:
+        for name in STATS_VIEWS:
+            conn.execute(text(f"DROP MATERIALIZED VIEW IF EXISTS {name}"))
+    print(f"✓ Dropped {', '.join(STATS_VIEWS)}")
+
+
+if __name__ == "__main__":
+    print("Running migration: add_stats_materialized_views")
+    upgrade()
+    print("Migration complete!")
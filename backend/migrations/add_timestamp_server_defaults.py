@@ -0,0 +1,56 @@
+"""
+Migration: Move timestamp defaults from Python to the database
+
+The models now use server_default=utcnow() instead of
+default=datetime.utcnow, so existing tables need a column DEFAULT or
+inserts that omit the timestamp would store NULL. One ALTER TABLE per
+table, all in a single transaction.
+
+Run with: cd backend && python -m migrations.add_timestamp_server_defaults
+"""
+
+from sqlalchemy import text
+from app.models.database import engine
+
+
+TIMESTAMP_COLUMNS = {
+    'users': ['created_at', 'last_active'],
+    'user_progress': ['last_accessed'],
+    'generated_content': ['created_at'],
+    'topic_insights': ['created_at', 'updated_at'],
+    'user_competencies': ['last_updated'],
+    'study_sessions': ['completed_at'],
+    'learning_paths': ['created_at', 'updated_at'],
+    'topic_structures': ['created_at', 'updated_at'],
+    'section_contents': ['created_at', 'updated_at'],
+}
+
+
+def _alter_statement(table: str, columns: list, clause: str) -> str:
+    return f"ALTER TABLE {table} " + ", ".join(
+        f"ALTER COLUMN {column} {clause}" for column in columns
+    )
+
+
+def upgrade():
+    """Set UTC server defaults on timestamp columns"""
+    with engine.begin() as conn:
+        for table, columns in TIMESTAMP_COLUMNS.items():
+            conn.execute(text(_alter_statement(
+                table, columns, "SET DEFAULT TIMEZONE('utc', CURRENT_TIMESTAMP)"
+            )))
+            print(f"✓ {table}: {', '.join(columns)}")
+
+
+def downgrade():
+    """Drop server defaults from timestamp columns"""
+    with engine.begin() as conn:
+        for table, columns in TIMESTAMP_COLUMNS.items():
+            conn.execute(text(_alter_statement(table, columns, "DROP DEFAULT")))
+            print(f"✓ {table}: {', '.join(columns)}")
+
+
+if __name__ == "__main__":
+    print("Running migration: add_timestamp_server_defaults")
+    upgrade()
+    print("Migration complete!")
@@ -0,0 +1,57 @@
+"""
+Migration: Per-user composite indexes for progress and learning path lookups
+
+user_progress gets (user_id, last_accessed DESC) INCLUDE-ing the columns the
+progress endpoint returns, so listing a user's progress (and their most
+recent activity) is an index-only scan. learning_paths gets
+(user_id, created_at DESC) for the latest-path lookup and the generation
+rate-limit check. users.user_id is already covered by its unique index.
+
+Indexes are built with CREATE INDEX CONCURRENTLY so writers are not
+blocked during rollout (requires autocommit, so no wrapping transaction).
+
+Run with: cd backend && python -m migrations.add_user_lookup_indexes
+"""
+
+from sqlalchemy import text
+from app.models.database import engine
+
+
+UPGRADE_STATEMENTS = [
+    "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_userprogress_user_last "
+    "ON user_progress (user_id, last_accessed DESC) "
+    "INCLUDE (node_id, completed, quiz_score, time_spent_minutes)",
+    "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_learningpath_user_created "
+    "ON learning_paths (user_id, created_at DESC)",
+]
+
+DOWNGRADE_STATEMENTS = [
+    "DROP INDEX CONCURRENTLY IF EXISTS ix_userprogress_user_last",
+    "DROP INDEX CONCURRENTLY IF EXISTS ix_learningpath_user_created",
+]
+
+
+def _run(statements):
+    # CONCURRENTLY cannot run inside a transaction block
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        for sql in statements:
+            conn.execute(text(sql))
+            print(f"✓ {sql.split(' ON ')[0]}")
+
+
+def upgrade():
+    """Create the per-user progress and learning path indexes"""
+    print("Adding per-user lookup indexes...")
+    _run(UPGRADE_STATEMENTS)
+
+
+def downgrade():
+    """Drop the per-user progress and learning path indexes"""
+    print("Removing per-user lookup indexes...")
+    _run(DOWNGRADE_STATEMENTS)
+
+
+if __name__ == "__main__":
+    print("Running migration: add_user_lookup_indexes")
+    upgrade()
+    print("Migration complete!")
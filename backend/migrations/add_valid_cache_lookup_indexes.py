@@ -0,0 +1,72 @@
+"""
+Migration: Partial (is_valid) composite indexes for the content cache lookups
+
+query_content matches cached rows on (node_id, content_type, difficulty_level
+| role_template_id | job_profile_hash, content_version, is_valid = true).
+The lookup indexes are rebuilt to include content_version and to cover only
+valid rows, so invalidated content no longer bloats them.
+
+Indexes are built with CREATE INDEX CONCURRENTLY so writers are not
+blocked during rollout (requires autocommit, so no wrapping transaction).
+
+Run with: cd backend && python -m migrations.add_valid_cache_lookup_indexes
+"""
+
+from sqlalchemy import text
+from app.models.database import engine
+
+
+UPGRADE_STATEMENTS = [
+    "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_gc_difficulty_lookup "
+    "ON generated_content (node_id, content_type, difficulty_level, content_version) "
+    "WHERE is_valid = true",
+    "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_gc_role_lookup_valid "
+    "ON generated_content (node_id, content_type, role_template_id, content_version) "
+    "WHERE role_template_id IS NOT NULL AND is_valid = true",
+    "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_gc_hash_lookup_valid "
+    "ON generated_content (node_id, content_type, job_profile_hash, content_version) "
+    "WHERE job_profile_hash IS NOT NULL AND is_valid = true",
+    "DROP INDEX CONCURRENTLY IF EXISTS ix_gc_lookup",
+    "DROP INDEX CONCURRENTLY IF EXISTS ix_gc_role_lookup",
+    "DROP INDEX CONCURRENTLY IF EXISTS ix_gc_hash_lookup",
+]
+
+DOWNGRADE_STATEMENTS = [
+    "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_gc_lookup "
+    "ON generated_content (node_id, content_type, difficulty_level, is_valid)",
+    "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_gc_role_lookup "
+    "ON generated_content (node_id, content_type, role_template_id, content_version) "
+    "WHERE role_template_id IS NOT NULL",
+    "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_gc_hash_lookup "
+    "ON generated_content (node_id, content_type, job_profile_hash, content_version) "
+    "WHERE job_profile_hash IS NOT NULL",
+    "DROP INDEX CONCURRENTLY IF EXISTS ix_gc_difficulty_lookup",
+    "DROP INDEX CONCURRENTLY IF EXISTS ix_gc_role_lookup_valid",
+    "DROP INDEX CONCURRENTLY IF EXISTS ix_gc_hash_lookup_valid",
+]
+
+
+def _run(statements):
+    # CONCURRENTLY cannot run inside a transaction block
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        for sql in statements:
+            conn.execute(text(sql))
+            print(f"✓ {sql.split(' ON ')[0]}")
+
+
+def upgrade():
+    """Create valid-only cache lookup indexes and drop the full ones"""
+    print("Adding partial cache lookup indexes...")
+    _run(UPGRADE_STATEMENTS)
+
+
+def downgrade():
+    """Restore the previous cache lookup indexes"""
+    print("Removing partial cache lookup indexes...")
+    _run(DOWNGRADE_STATEMENTS)
+
+
+if __name__ == "__main__":
+    print("Running migration: add_valid_cache_lookup_indexes")
+    upgrade()
+    print("Migration complete!")
@@ -0,0 +1,51 @@
+"""
+Migration: Convert JSON columns to JSONB (PostgreSQL)
+
+JSONB is stored in a decomposed binary form, so reads skip re-parsing the
+text representation. Each table's columns are converted with a single
+ALTER TABLE, and all tables are converted in one transaction.
+
+Run with: cd backend && python -m migrations.convert_json_to_jsonb
+"""
+
+from sqlalchemy import text
+from app.models.database import engine
+
+
+JSONB_COLUMNS = {
+    'nodes': ['extra_metadata'],
+    'content_chunks': ['extra_metadata'],
+    'users': ['preferences', 'target_roles'],
+    'user_progress': ['extra_metadata'],
+    # generated_content's payload columns live on generated_content_bodies,
+    # which split_generated_content_body creates as JSONB
+}
+
+
+def _alter_statement(table: str, columns: list, target_type: str) -> str:
+    return f"ALTER TABLE {table} " + ", ".join(
+        f"ALTER COLUMN {column} TYPE {target_type} USING {column}::{target_type.lower()}"
+        for column in columns
+    )
+
+
+def upgrade():
+    """Convert JSON columns to JSONB"""
+    with engine.begin() as conn:
+        for table, columns in JSONB_COLUMNS.items():
+            conn.execute(text(_alter_statement(table, columns, "JSONB")))
+            print(f"✓ {table}: {', '.join(columns)} -> JSONB")
+
+
+def downgrade():
+    """Convert JSONB columns back to JSON"""
+    with engine.begin() as conn:
+        for table, columns in JSONB_COLUMNS.items():
+            conn.execute(text(_alter_statement(table, columns, "JSON")))
+            print(f"✓ {table}: {', '.join(columns)} -> JSON")
+
+
+if __name__ == "__main__":
+    print("Running migration: convert_json_to_jsonb")
+    upgrade()
+    print("Migration complete!")
@@ -0,0 +1,85 @@
+"""
+Migration: Move learning-path fields out of nodes.extra_metadata into columns
+
+learning_path, sequence_order, prerequisites_ids and tags used to live in
+the JSON blob behind Python properties. They are now real (indexed /
+array) columns; this backfills them from extra_metadata and removes the
+keys from the blob, all in one transaction.
+
+Run with: cd backend && python -m migrations.flatten_node_learning_path
+"""
+
+from sqlalchemy import text
+from app.models.database import engine
+
+
+ADD_COLUMNS_SQL = """
+    ALTER TABLE nodes
+        ADD COLUMN IF NOT EXISTS learning_path VARCHAR(100),
+        ADD COLUMN IF NOT EXISTS sequence_order INTEGER,
+        ADD COLUMN IF NOT EXISTS prerequisites_ids INTEGER[] DEFAULT '{}',
+        ADD COLUMN IF NOT EXISTS tags VARCHAR(100)[] DEFAULT '{}'
+"""
+
+BACKFILL_SQL = """
+    UPDATE nodes SET
+        learning_path = extra_metadata::jsonb ->> 'learning_path',
+        sequence_order = (extra_metadata::jsonb ->> 'sequence_order')::int,
+        prerequisites_ids = CASE
+            WHEN jsonb_typeof(extra_metadata::jsonb -> 'prerequisites_ids') = 'array'
+            THEN ARRAY(SELECT jsonb_array_elements_text(extra_metadata::jsonb -> 'prerequisites_ids')::int)
+            ELSE '{}' END,
+        tags = CASE
+            WHEN jsonb_typeof(extra_metadata::jsonb -> 'tags') = 'array'
+            THEN ARRAY(SELECT jsonb_array_elements_text(extra_metadata::jsonb -> 'tags'))
+            ELSE '{}' END,
+        extra_metadata = extra_metadata::jsonb
+            - 'learning_path' - 'sequence_order' - 'prerequisites_ids' - 'tags'
+    WHERE extra_metadata IS NOT NULL
+"""
+
+INDEX_SQL = [
+    "CREATE INDEX IF NOT EXISTS ix_nodes_learning_path ON nodes (learning_path)",
+    "CREATE INDEX IF NOT EXISTS ix_nodes_sequence_order ON nodes (sequence_order)",
+]
+
+RESTORE_SQL = """
+    UPDATE nodes SET extra_metadata = COALESCE(extra_metadata::jsonb, '{}'::jsonb)
+        || jsonb_build_object(
+            'learning_path', learning_path,
+            'sequence_order', sequence_order,
+            'prerequisites_ids', to_jsonb(COALESCE(prerequisites_ids, '{}')),
+            'tags', to_jsonb(COALESCE(tags, '{}'))
+        )
+    WHERE learning_path IS NOT NULL OR sequence_order IS NOT NULL
+       OR cardinality(prerequisites_ids) > 0 OR cardinality(tags) > 0
+"""
+
+
+def upgrade():
+    """Add learning-path columns and backfill them from extra_metadata"""
+    with engine.begin() as conn:
+        conn.execute(text(ADD_COLUMNS_SQL))
+        result = conn.execute(text(BACKFILL_SQL))
+        for sql in INDEX_SQL:
+            conn.execute(text(sql))
+        print(f"✓ Backfilled learning-path columns for {result.rowcount} nodes")
+
+
+def downgrade():
+    """Fold learning-path columns back into extra_metadata and drop them"""
+    with engine.begin() as conn:
+        conn.execute(text(RESTORE_SQL))
+        conn.execute(text(
+            "ALTER TABLE nodes DROP COLUMN IF EXISTS learning_path, "
+            "DROP COLUMN IF EXISTS sequence_order, "
+            "DROP COLUMN IF EXISTS prerequisites_ids, "
+            "DROP COLUMN IF EXISTS tags"
+        ))
+        print("✓ Restored learning-path fields into extra_metadata")
+
+
+if __name__ == "__main__":
+    print("Running migration: flatten_node_learning_path")
+    upgrade()
+    print("Migration complete!")
@@ -0,0 +1,117 @@
+"""
+Migration runner: apply all pending schema migrations in one go
+
+Opens a single connection and applies each (name, sql) step inside its own
+SAVEPOINT, so a failing step is rolled back without aborting the others.
+Everything is committed once at the end. Applied steps are recorded in
+_schema_migrations, making re-runs a single SELECT.
+
+Index builds (add_cache_lookup_indexes) use CREATE INDEX CONCURRENTLY,
+which cannot run inside a transaction - run that migration on its own.
+
+Run with: cd backend && python -m migrations.run_all
+"""
+
+from sqlalchemy import text
+from app.models.database import engine
+from migrations.convert_json_to_jsonb import JSONB_COLUMNS
+from migrations.convert_json_to_jsonb import _alter_statement as _jsonb_statement
+from migrations.add_timestamp_server_defaults import TIMESTAMP_COLUMNS
+from migrations.add_timestamp_server_defaults import _alter_statement as _timestamp_statement
+from migrations.add_profile_completion_column import BACKFILL_SQL as _PROFILE_COMPLETION_BACKFILL
+from migrations.split_generated_content_body import GUARDED_UPGRADE_SQL as _SPLIT_GENERATED_CONTENT_SQL
+from migrations.add_job_profile_hash_column import BACKFILL_SQL as _JOB_PROFILE_HASH_BACKFILL
+from migrations.add_platform_stats import CREATE_SQL as _PLATFORM_STATS_SQL
+from migrations.add_platform_stats import SEED_SQL as _PLATFORM_STATS_SEED
+from migrations.flatten_node_learning_path import ADD_COLUMNS_SQL as _NODE_COLUMNS_SQL
+from migrations.flatten_node_learning_path import BACKFILL_SQL as _NODE_COLUMNS_BACKFILL
+from migrations.flatten_node_learning_path import INDEX_SQL as _NODE_COLUMNS_INDEXES
+from migrations.add_path_generation_claims import CREATE_SQL as _PATH_CLAIMS_SQL
+from migrations.add_path_generation_claims import SEED_SQL as _PATH_CLAIMS_SEED
+
+
+PHASE2_COLUMNS = [
+    'email VARCHAR(200)',
+    'phone VARCHAR(50)',
+    'cv_url VARCHAR(500)',
+    'linkedin_url VARCHAR(500)',
+    'education_level VARCHAR(50)',
+    'years_experience INTEGER',
+    'target_roles JSON',
+]
+
+MIGRATIONS = [
+    ("add_phase2_columns", "ALTER TABLE users " + ", ".join(
+        f"ADD COLUMN IF NOT EXISTS {column}" for column in PHASE2_COLUMNS
+    )),
+    ("add_dependencies_column",
+     "ALTER TABLE learning_paths ADD COLUMN IF NOT EXISTS dependencies JSON DEFAULT '[]'"),
+    ("convert_json_to_jsonb", "; ".join(
+        _jsonb_statement(table, columns, "JSONB") for table, columns in JSONB_COLUMNS.items()
+    )),
+    ("add_timestamp_server_defaults", "; ".join(
+        _timestamp_statement(table, columns, "SET DEFAULT TIMEZONE('utc', CURRENT_TIMESTAMP)")
+        for table, columns in TIMESTAMP_COLUMNS.items()
+    )),
+    ("add_profile_completion_column",
+     "ALTER TABLE users ADD COLUMN IF NOT EXISTS profile_completion_percent INTEGER DEFAULT 0; "
+     + _PROFILE_COMPLETION_BACKFILL),
+    ("split_generated_content_body", _SPLIT_GENERATED_CONTENT_SQL),
+    # Node reads select these columns, so existing databases need them before startup
+    ("flatten_node_learning_path", "; ".join(
+        [_NODE_COLUMNS_SQL, _NODE_COLUMNS_BACKFILL] + _NODE_COLUMNS_INDEXES
+    )),
+    ("add_job_profile_hash_column",
+     "ALTER TABLE users ADD COLUMN IF NOT EXISTS job_profile_hash VARCHAR(16); "
+     + _JOB_PROFILE_HASH_BACKFILL),
+    # Startup create_all makes the table empty; the seed counts existing content
+    ("add_platform_stats", _PLATFORM_STATS_SQL + "; " + _PLATFORM_STATS_SEED),
+    # Rows cached earlier keep NULL and are serialized on the fly when hit
+    ("add_response_json_column",
+     "ALTER TABLE generated_content_bodies ADD COLUMN IF NOT EXISTS response_json TEXT"),
+    # Carries users' current rate-limit windows over from learning_paths
+    ("add_path_generation_claims", _PATH_CLAIMS_SQL + "; " + _PATH_CLAIMS_SEED),
+]
+
+
+def upgrade():
+    """Apply every migration not yet recorded in _schema_migrations"""
+    failed = []
+    with engine.connect() as conn:
+        conn.execute(text(
+            "CREATE TABLE IF NOT EXISTS _schema_migrations (name TEXT PRIMARY KEY)"
+        ))
+        applied = set(conn.execute(text("SELECT name FROM _schema_migrations")).scalars())
+
+        for name, sql in MIGRATIONS:
+            if name in applied:
+                print(f"✓ {name} (already applied)")
+                continue
+
+            savepoint = conn.begin_nested()
+            try:
+                conn.execute(text(sql))
+                conn.execute(
+                    text("INSERT INTO _schema_migrations (name) VALUES (:name) "
+                         "ON CONFLICT DO NOTHING"),
+                    {"name": name}
+                )
+                savepoint.commit()
+                print(f"✓ {name}")
+            except Exception as e:
+                savepoint.rollback()
+                failed.append(name)
+                print(f"❌ {name}: {e}")
+
+        conn.commit()
+
+    return failed
+
+
+if __name__ == "__main__":
+    print("Running pending migrations")
+    failed = upgrade()
+    if failed:
+        print(f"Migration finished with failures: {', '.join(failed)}")
+        raise SystemExit(1)
+    print("Migration complete!")
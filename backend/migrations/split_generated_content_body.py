@@ -0,0 +1,95 @@
+"""
+Migration: Move GeneratedContent payload columns into generated_content_bodies
+
+generated_content, interactive_component, source_chunks and related_topics
+move to a 1:1 table keyed by the same id, leaving generated_content with
+only lookup keys and counters. Runs in one transaction; re-running is safe.
+
+Run with: cd backend && python -m migrations.split_generated_content_body
+"""
+
+from sqlalchemy import text
+from app.models.database import engine
+
+
+BODY_COLUMNS = ['generated_content', 'interactive_component', 'source_chunks', 'related_topics']
+
+UPGRADE_SQL = """
+    CREATE TABLE IF NOT EXISTS generated_content_bodies (
+        id INTEGER PRIMARY KEY REFERENCES generated_content (id) ON DELETE CASCADE,
+        generated_content TEXT NOT NULL,
+        interactive_component JSONB,
+        source_chunks JSONB,
+        related_topics JSONB
+    );
+    INSERT INTO generated_content_bodies
+        (id, generated_content, interactive_component, source_chunks, related_topics)
+    SELECT id, generated_content, interactive_component::jsonb, source_chunks::jsonb, related_topics::jsonb
+    FROM generated_content
+    ON CONFLICT (id) DO NOTHING;
+    ALTER TABLE generated_content
+        DROP COLUMN generated_content,
+        DROP COLUMN interactive_component,
+        DROP COLUMN source_chunks,
+        DROP COLUMN related_topics
+"""
+
+BODY_COLUMNS_PRESENT_SQL = """
+    SELECT 1 FROM information_schema.columns
+    WHERE table_name = 'generated_content' AND column_name = 'generated_content'
+"""
+
+# For run_all, which has no Python-side check: a schema built by create_all
+# never had the payload columns, so the split becomes a no-op there
+GUARDED_UPGRADE_SQL = f"""
+    DO $$
+    BEGIN
+        IF EXISTS ({BODY_COLUMNS_PRESENT_SQL}) THEN
+            {UPGRADE_SQL};
+        END IF;
+    END $$
+"""
+
+DOWNGRADE_SQL = """
+    ALTER TABLE generated_content
+        ADD COLUMN IF NOT EXISTS generated_content TEXT,
+        ADD COLUMN IF NOT EXISTS interactive_component JSONB,
+        ADD COLUMN IF NOT EXISTS source_chunks JSONB,
+        ADD COLUMN IF NOT EXISTS related_topics JSONB;
+    UPDATE generated_content gc SET
+        generated_content = b.generated_content,
+        interactive_component = b.interactive_component,
+        source_chunks = b.source_chunks,
+        related_topics = b.related_topics
+    FROM generated_content_bodies b
+    WHERE b.id = gc.id;
+    DROP TABLE generated_content_bodies
+"""
+
+
+def _body_columns_present(conn) -> bool:
+    result = conn.execute(text(BODY_COLUMNS_PRESENT_SQL))
+    return result.first() is not None
+
+
+def upgrade():
+    """Split payload columns out of generated_content"""
+    with engine.begin() as conn:
+        if not _body_columns_present(conn):
+            print("✓ generated_content already split")
+            return
+        conn.execute(text(UPGRADE_SQL))
+        print(f"✓ Moved {', '.join(BODY_COLUMNS)} to generated_content_bodies")
+
+
+def downgrade():
+    """Fold generated_content_bodies back into generated_content"""
+    with engine.begin() as conn:
+        conn.execute(text(DOWNGRADE_SQL))
+        print("✓ Restored payload columns on generated_content")
+
+
+if __name__ == "__main__":
+    print("Running migration: split_generated_content_body")
+    upgrade()
+    print("Migration complete!")
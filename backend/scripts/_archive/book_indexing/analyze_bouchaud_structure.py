@@ -11,6 +11,22 @@ sys.path.insert(0, str(Path(__file__).parent.parent))
 import fitz  # PyMuPDF
 import re
 
+# Common chapter/part heading patterns in a TOC
+CHAPTER_PATTERNS = [
+    re.compile(pattern, re.MULTILINE | re.IGNORECASE)
+    for pattern in (
+        r'Chapter\s+(\d+)[:\.\s]+(.+?)(?=\n|\d+$)',
+        r'CHAPTER\s+(\d+)[:\.\s]+(.+?)(?=\n|\d+$)',
+        r'^(\d+)\.\s+(.+?)(?=\n|\d+$)',
+        r'Part\s+([IVX]+)[:\.\s]+(.+?)(?=\n)',
+        r'PART\s+([IVX]+)[:\.\s]+(.+?)(?=\n)',
+    )
+]
+
+# Plain line-oriented text is enough for TOC/keyword scans; dropping ligature
+# preservation also lets words like "fit" match when typeset with ligatures
+TEXT_FLAGS = fitz.TEXT_PRESERVE_WHITESPACE | fitz.TEXT_MEDIABOX_CLIP
+
 def extract_toc(pdf_path):
     """Extract table of contents and chapter information"""
     print("=" * 80)
@@ -27,95 +43,85 @@ def extract_toc(pdf_path):
     print("Scanning first 30 pages for Table of Contents...")
     print()
 
-    toc_text = ""
+    toc_pages = []
     for i in range(min(30, total_pages)):
-        page = doc[i]
-        text = page.get_text()
-        toc_text += text + "\n"
-
-        # Try to find chapter/section patterns
-        print("=" * 80)
-        print("TABLE OF CONTENTS / CHAPTERS")
-        print("=" * 80)
-
-        # Look for common patterns
-        chapter_patterns = [
-            r'Chapter\s+(\d+)[:\.\s]+(.+?)(?=\n|\d+$)',
-            r'CHAPTER\s+(\d+)[:\.\s]+(.+?)(?=\n|\d+$)',
-            r'^(\d+)\.\s+(.+?)(?=\n|\d+$)',
-            r'Part\s+([IVX]+)[:\.\s]+(.+?)(?=\n)',
-            r'PART\s+([IVX]+)[:\.\s]+(.+?)(?=\n)',
-        ]
-
-        chapters_found = []
-        for pattern in chapter_patterns:
-            matches = re.finditer(pattern, toc_text, re.MULTILINE | re.IGNORECASE)
-            for match in matches:
-                chapters_found.append((match.group(1), match.group(2).strip()))
-
-        if chapters_found:
-            print("\nChapters/Sections found:")
-            for num, title in chapters_found:
-                print(f"  {num}. {title}")
-        else:
-            print("\nNo clear chapter structure found in standard format.")
-            print("Showing first 2000 characters of TOC area:")
-            print("-" * 80)
-            print(toc_text[:2000])
-
-        print()
-        print("=" * 80)
-        print("SEARCHING FOR STATISTICS & TIME SERIES KEYWORDS")
-        print("=" * 80)
-
-        # Search entire book for relevant keywords
-        keywords = [
-            'time series', 'time-series', 'autocorrelation', 'ARMA', 'GARCH',
-            'stochastic process', 'random walk', 'brownian motion',
-            'variance', 'volatility', 'distribution', 'gaussian', 'heavy tail',
-            'tail risk', 'extreme value', 'correlation', 'covariance',
-            'statistical', 'probability distribution', 'moment',
-            'kurtosis', 'skewness', 'fat tail'
-        ]
-
-        keyword_pages = {kw: [] for kw in keywords}
-
-        print(f"\nScanning all {total_pages} pages for keywords...")
-        for page_num in range(total_pages):
-            text = doc[page_num].get_text().lower()
-            for keyword in keywords:
-                if keyword.lower() in text:
-                    keyword_pages[keyword].append(page_num + 1)
-
-        # Show results
-        print("\nKeyword frequency (pages where found):")
-        for keyword, pages in sorted(keyword_pages.items(), key=lambda x: len(x[1]), reverse=True):
-            if pages:
-                page_ranges = []
-                if len(pages) <= 10:
-                    page_ranges = str(pages[:10])
-                else:
-                    page_ranges = f"{pages[0]}-{pages[-1]} ({len(pages)} occurrences)"
-                print(f"  '{keyword}': {page_ranges}")
-
-        print()
-        print("=" * 80)
-        print("SAMPLE CONTENT FROM KEY PAGES")
-        print("=" * 80)
-
-        # Show sample from pages with most time series content
-        time_series_pages = keyword_pages.get('time series', []) or keyword_pages.get('time-series', [])
-        if time_series_pages:
-            sample_page = time_series_pages[len(time_series_pages)//2]  # Middle page
-            print(f"\nSample from page {sample_page} (time series content):")
-            print("-" * 80)
-            sample_text = doc[sample_page - 1].get_text()
-            print(sample_text[:1500])
-
-        print()
-        print("=" * 80)
-        print("Analysis complete!")
-        print("=" * 80)
+        toc_pages.append(doc[i].get_text("text", flags=TEXT_FLAGS))
+    toc_text = "\n".join(toc_pages)
+
+    # Try to find chapter/section patterns
+    print("=" * 80)
+    print("TABLE OF CONTENTS / CHAPTERS")
+    print("=" * 80)
+
+    chapters_found = []
+    for pattern in CHAPTER_PATTERNS:
+        matches = pattern.finditer(toc_text)
+        for match in matches:
+            chapters_found.append((match.group(1), match.group(2).strip()))
+
+    if chapters_found:
+        print("\nChapters/Sections found:")
+        for num, title in chapters_found:
+            print(f"  {num}. {title}")
+    else:
+        print("\nNo clear chapter structure found in standard format.")
+        print("Showing first 2000 characters of TOC area:")
+        print("-" * 80)
+        print(toc_text[:2000])
+
+    print()
+    print("=" * 80)
+    print("SEARCHING FOR STATISTICS & TIME SERIES KEYWORDS")
+    print("=" * 80)
+
+    # Search entire book for relevant keywords
+    keywords = [
+        'time series', 'time-series', 'autocorrelation', 'ARMA', 'GARCH',
+        'stochastic process', 'random walk', 'brownian motion',
+        'variance', 'volatility', 'distribution', 'gaussian', 'heavy tail',
+        'tail risk', 'extreme value', 'correlation', 'covariance',
+        'statistical', 'probability distribution', 'moment',
+        'kurtosis', 'skewness', 'fat tail'
+    ]
+
+    keyword_pages = {kw: [] for kw in keywords}
+
+    print(f"\nScanning all {total_pages} pages for keywords...")
+    for page_num in range(total_pages):
+        text = doc[page_num].get_text("text", flags=TEXT_FLAGS).lower()
+        for keyword in keywords:
+            if keyword.lower() in text:
+                keyword_pages[keyword].append(page_num + 1)
+
+    # Show results
+    print("\nKeyword frequency (pages where found):")
+    for keyword, pages in sorted(keyword_pages.items(), key=lambda x: len(x[1]), reverse=True):
+        if pages:
+            page_ranges = []
+            if len(pages) <= 10:
+                page_ranges = str(pages[:10])
+            else:
+                page_ranges = f"{pages[0]}-{pages[-1]} ({len(pages)} occurrences)"
+            print(f"  '{keyword}': {page_ranges}")
+
+    print()
+    print("=" * 80)
+    print("SAMPLE CONTENT FROM KEY PAGES")
+    print("=" * 80)
+
+    # Show sample from pages with most time series content
+    time_series_pages = keyword_pages.get('time series', []) or keyword_pages.get('time-series', [])
+    if time_series_pages:
+        sample_page = time_series_pages[len(time_series_pages)//2]  # Middle page
+        print(f"\nSample from page {sample_page} (time series content):")
+        print("-" * 80)
+        sample_text = doc[sample_page - 1].get_text()
+        print(sample_text[:1500])
+
+    print()
+    print("=" * 80)
+    print("Analysis complete!")
+    print("=" * 80)
 
     doc.close()
 
@@ -208,15 +208,16 @@ class ContentIndexer:
                 }
             )
 
-            # Save chunk metadata to PostgreSQL
-            for i, (chunk_text, vector_id) in enumerate(zip(chunks, vector_ids)):
-                content_chunk = ContentChunk(
+            # Save chunk metadata to PostgreSQL (one batched insert per node)
+            self.db.add_all([
+                ContentChunk(
                     node_id=node.id,
                     chunk_text=chunk_text,
                     chunk_index=i,
                     vector_id=vector_id
                 )
-                self.db.add(content_chunk)
+                for i, (chunk_text, vector_id) in enumerate(zip(chunks, vector_ids))
+            ])
 
             self.db.commit()
             print(f"Indexed {len(chunks)} chunks for node '{title}'")
@@ -18,7 +18,7 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
-from app.models.database import Base, Node
+from app.models.database import Base, Node, bulk_add_edges
 from app.config.settings import settings
 
 
@@ -43,6 +43,7 @@ def main():
         print("Database tables recreated successfully!")
 
         print("Creating nodes...")
+        edges = []  # (parent, child) pairs, inserted in one batch once ids exist
 
         # Linear Algebra nodes
         la_root = Node(
@@ -58,8 +59,6 @@ def main():
             content_path="../content/linear_algebra/overview.md"
         )
         db.add(la_root)
-        db.commit()
-        db.refresh(la_root)
 
         vectors = Node(
             title="Vectors and Spaces",
@@ -74,10 +73,8 @@ def main():
             icon="➡️",
             content_path="../content/linear_algebra/vectors.md"
         )
-        vectors.parents.append(la_root)
+        edges += [(la_root, vectors)]
         db.add(vectors)
-        db.commit()
-        db.refresh(vectors)
 
         matrices = Node(
             title="Matrix Operations",
@@ -92,10 +89,8 @@ def main():
             icon="⊞",
             content_path="../content/linear_algebra/matrices.md"
         )
-        matrices.parents.extend([la_root, vectors])
+        edges += [(la_root, matrices), (vectors, matrices)]
         db.add(matrices)
-        db.commit()
-        db.refresh(matrices)
 
         transforms = Node(
             title="Linear Transformations",
@@ -110,10 +105,8 @@ def main():
             icon="🔄",
             content_path="../content/linear_algebra/transformations.md"
         )
-        transforms.parents.extend([la_root, matrices])
+        edges += [(la_root, transforms), (matrices, transforms)]
         db.add(transforms)
-        db.commit()
-        db.refresh(transforms)
 
         eigen = Node(
             title="Eigenvalues and Eigenvectors",
@@ -128,10 +121,8 @@ def main():
             icon="λ",
             content_path="../content/linear_algebra/eigenvalues.md"
         )
-        eigen.parents.extend([matrices, transforms])
+        edges += [(matrices, eigen), (transforms, eigen)]
         db.add(eigen)
-        db.commit()
-        db.refresh(eigen)
 
         svd = Node(
             title="SVD and Decompositions",
@@ -146,10 +137,8 @@ def main():
             icon="🔸",
             content_path="../content/linear_algebra/svd.md"
         )
-        svd.parents.append(eigen)
+        edges += [(eigen, svd)]
         db.add(svd)
-        db.commit()
-        db.refresh(svd)
 
         # Calculus nodes
         calc_root = Node(
@@ -165,8 +154,6 @@ def main():
             content_path="../content/calculus/overview.md"
         )
         db.add(calc_root)
-        db.commit()
-        db.refresh(calc_root)
 
         limits = Node(
             title="Limits and Continuity",
@@ -181,10 +168,8 @@ def main():
             icon="→",
             content_path="../content/calculus/limits.md"
         )
-        limits.parents.append(calc_root)
+        edges += [(calc_root, limits)]
         db.add(limits)
-        db.commit()
-        db.refresh(limits)
 
         derivatives = Node(
             title="Derivatives",
@@ -199,10 +184,8 @@ def main():
             icon="d/dx",
             content_path="../content/calculus/derivatives.md"
         )
-        derivatives.parents.extend([calc_root, limits])
+        edges += [(calc_root, derivatives), (limits, derivatives)]
         db.add(derivatives)
-        db.commit()
-        db.refresh(derivatives)
 
         integrals = Node(
             title="Integration",
@@ -217,10 +200,8 @@ def main():
             icon="∫",
             content_path="../content/calculus/integrals.md"
         )
-        integrals.parents.extend([calc_root, derivatives])
+        edges += [(calc_root, integrals), (derivatives, integrals)]
         db.add(integrals)
-        db.commit()
-        db.refresh(integrals)
 
         multivariable = Node(
             title="Multivariable Calculus",
@@ -235,10 +216,8 @@ def main():
             icon="∇",
             content_path="../content/calculus/multivariable.md"
         )
-        multivariable.parents.extend([derivatives, integrals])
+        edges += [(derivatives, multivariable), (integrals, multivariable)]
         db.add(multivariable)
-        db.commit()
-        db.refresh(multivariable)
 
         # Probability nodes
         prob_root = Node(
@@ -254,8 +233,6 @@ def main():
             content_path="../content/probability/overview.md"
         )
         db.add(prob_root)
-        db.commit()
-        db.refresh(prob_root)
 
         prob_foundations = Node(
             title="Probability Foundations",
@@ -270,10 +247,8 @@ def main():
             icon="Ω",
             content_path="../content/probability/foundations.md"
         )
-        prob_foundations.parents.append(prob_root)
+        edges += [(prob_root, prob_foundations)]
         db.add(prob_foundations)
-        db.commit()
-        db.refresh(prob_foundations)
 
         random_vars = Node(
             title="Random Variables and Distributions",
@@ -288,10 +263,8 @@ def main():
             icon="X",
             content_path="../content/probability/random_variables.md"
         )
-        random_vars.parents.extend([prob_root, prob_foundations])
+        edges += [(prob_root, random_vars), (prob_foundations, random_vars)]
         db.add(random_vars)
-        db.commit()
-        db.refresh(random_vars)
 
         expectation = Node(
             title="Expectation and Moments",
@@ -306,10 +279,8 @@ def main():
             icon="E[X]",
             content_path="../content/probability/expectation.md"
         )
-        expectation.parents.extend([prob_root, random_vars])
+        edges += [(prob_root, expectation), (random_vars, expectation)]
         db.add(expectation)
-        db.commit()
-        db.refresh(expectation)
 
         # Statistics nodes
         stats_root = Node(
@@ -325,8 +296,6 @@ def main():
             content_path="../content/statistics/overview.md"
         )
         db.add(stats_root)
-        db.commit()
-        db.refresh(stats_root)
 
         inference = Node(
             title="Statistical Inference",
@@ -341,10 +310,8 @@ def main():
             icon="CI",
             content_path="../content/statistics/inference.md"
         )
-        inference.parents.extend([stats_root, expectation])
+        edges += [(stats_root, inference), (expectation, inference)]
         db.add(inference)
-        db.commit()
-        db.refresh(inference)
 
         regression = Node(
             title="Regression Analysis",
@@ -359,10 +326,8 @@ def main():
             icon="β",
             content_path="../content/statistics/regression.md"
         )
-        regression.parents.extend([stats_root, inference, multivariable])
+        edges += [(stats_root, regression), (inference, regression), (multivariable, regression)]
         db.add(regression)
-        db.commit()
-        db.refresh(regression)
 
         timeseries = Node(
             title="Time Series Analysis",
@@ -377,10 +342,12 @@ def main():
             icon="📈",
             content_path="../content/statistics/time_series.md"
         )
-        timeseries.parents.extend([stats_root, regression])
+        edges += [(stats_root, timeseries), (regression, timeseries)]
         db.add(timeseries)
+
+        db.flush()  # Assign node ids
+        bulk_add_edges(db, [(parent.id, child.id) for parent, child in edges])
         db.commit()
-        db.refresh(timeseries)
 
         print("\n" + "=" * 60)
         print("Content indexing completed successfully!")
@@ -11,6 +11,13 @@ from typing import Dict, List, Tuple, Optional
 from pathlib import Path
 
 
+# Section headers like "3.1 Introduction" or "3.2.1 Subset Selection"
+_SECTION_RE = re.compile(r'^(\d+\.\d+(?:\.\d+)?)\s+([A-Z][^\n]+)$')
+
+# Title lookup only needs line-oriented text, no ligature preservation
+_TITLE_TEXT_FLAGS = fitz.TEXT_PRESERVE_WHITESPACE | fitz.TEXT_MEDIABOX_CLIP
+
+
 class ESLBookExtractor:
     """Extract content from Elements of Statistical Learning PDF"""
 
@@ -92,7 +99,7 @@ class ESLBookExtractor:
         text = self.extract_text_from_pages(start_page, end_page)
 
         # Extract chapter title from first page
-        first_page_text = self.doc[start_page].get_text()
+        first_page_text = self.doc[start_page].get_text("text", flags=_TITLE_TEXT_FLAGS)
         title = self._extract_chapter_title(first_page_text, chapter_num)
 
         return {
@@ -153,15 +160,12 @@ class ESLBookExtractor:
         """
         sections = []
 
-        # Pattern for section headers like "3.1 Introduction" or "3.2.1 Subset Selection"
-        section_pattern = r'^(\d+\.\d+(?:\.\d+)?)\s+([A-Z][^\n]+)$'
-
         lines = text.split('\n')
         current_section = None
         current_content = []
 
         for line in lines:
-            match = re.match(section_pattern, line.strip())
+            match = _SECTION_RE.match(line.strip())
 
             if match:
                 # Save previous section if exists
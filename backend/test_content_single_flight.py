@@ -0,0 +1,86 @@
+"""
+Test script for the content cache single-flight
+Two concurrent cache misses for the same content must produce exactly one
+LLM generation: the second request waits (without holding a database
+connection) and is then served from the cache the first one filled.
+
+Run with: cd backend && python test_content_single_flight.py
+"""
+import threading
+from types import SimpleNamespace
+from unittest import mock
+
+from fastapi import BackgroundTasks
+
+from app.models.schemas import QueryRequest
+from app.routes import content
+
+
+def _fake_session(cache: dict, on_commit=None) -> mock.MagicMock:
+    """Session whose cache lookup returns whatever the cache dict holds"""
+    db = mock.MagicMock()
+    db.get.return_value = SimpleNamespace(title="Linear Regression", extra_metadata=None)
+    db.execute.return_value.scalars.return_value.first.side_effect = lambda: cache.get("row")
+    if on_commit is not None:
+        db.commit.side_effect = on_commit
+    return db
+
+
+def test_concurrent_misses_generate_once():
+    """The second miss waits for the first generation and serves its result"""
+    print("\n=== Testing concurrent cache misses ===")
+
+    cache = {}
+    generations = []
+    generating = threading.Event()
+    second_waiting = threading.Event()
+    finish_generation = threading.Event()
+
+    def fake_generate(db, request, *args):
+        generations.append(request.node_id)
+        generating.set()
+        # Hold the generation until the second request is blocked on it
+        finish_generation.wait(5)
+        cache["row"] = SimpleNamespace(id=1)
+        return "generated"
+
+    def fake_serve(background_tasks, request, node, cached, cache_key, node_version):
+        return "cached"
+
+    user = SimpleNamespace(job_description=None, learning_level=3)
+    request = QueryRequest(node_id=1, query_type="explanation", user_id="demo_user")
+    results = []
+
+    def query(db):
+        results.append(content.query_content(request, BackgroundTasks(), db))
+
+    with mock.patch.object(content, "get_or_create_user", return_value=user), \
+            mock.patch.object(content, "_generate_and_cache", side_effect=fake_generate), \
+            mock.patch.object(content, "_serve_cached", side_effect=fake_serve):
+        first = threading.Thread(target=query, args=(_fake_session(cache),))
+        first.start()
+        assert generating.wait(5), "first request never started generating"
+
+        # Its only commit is the connection release right before blocking
+        second_db = _fake_session(cache, on_commit=lambda: second_waiting.set())
+        second = threading.Thread(target=query, args=(second_db,))
+        second.start()
+        assert second_waiting.wait(5), "second request never waited on the generation"
+
+        finish_generation.set()
+        first.join(5)
+        second.join(5)
+
+    assert len(generations) == 1, f"expected one generation, got {len(generations)}"
+    assert sorted(results) == ["cached", "generated"], results
+    assert second_db.commit.call_count == 1
+    assert not content._GENERATION_LOCKS, "single-flight lock was not cleaned up"
+    print("✅ Two concurrent misses produced exactly one generation")
+
+
+if __name__ == "__main__":
+    try:
+        test_concurrent_misses_generate_once()
+    except AssertionError as e:
+        print(f"❌ {str(e)}")
+        raise SystemExit(1)
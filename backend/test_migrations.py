@@ -0,0 +1,80 @@
+"""
+Test script for the schema migrations
+Builds a fresh schema with create_all, as a new install does on startup, and
+checks the migrations apply cleanly to it and can be re-run.
+
+WARNING: drops everything in the target database's public schema. Point
+TEST_DATABASE_URL at a scratch PostgreSQL database.
+
+Run with: cd backend && TEST_DATABASE_URL=postgresql://... python test_migrations.py
+"""
+import os
+
+TEST_DATABASE_URL = os.getenv("TEST_DATABASE_URL")
+if TEST_DATABASE_URL:
+    # Must be set before app.models.database builds the engine
+    os.environ["DATABASE_URL"] = TEST_DATABASE_URL
+
+
+def _fresh_schema():
+    """Drop everything and rebuild the tables from the models"""
+    if not TEST_DATABASE_URL:
+        raise RuntimeError("Set TEST_DATABASE_URL to a scratch PostgreSQL database")
+
+    from sqlalchemy import text
+    from app.models.database import Base, engine
+
+    with engine.begin() as conn:
+        conn.execute(text("DROP SCHEMA public CASCADE"))
+        conn.execute(text("CREATE SCHEMA public"))
+    Base.metadata.create_all(bind=engine)
+
+
+def test_run_all_twice():
+    """run_all applies every step to a fresh schema, then re-runs cleanly"""
+    print("\n=== Testing run_all on a fresh schema ===")
+    from migrations import run_all
+
+    _fresh_schema()
+    assert run_all.upgrade() == [], "first run_all.upgrade() had failing steps"
+    assert run_all.upgrade() == [], "second run_all.upgrade() had failing steps"
+    print("✅ run_all applied and re-ran cleanly")
+
+
+def test_convert_json_to_jsonb_twice():
+    """The standalone JSONB conversion succeeds on a fresh schema, twice"""
+    print("\n=== Testing convert_json_to_jsonb on a fresh schema ===")
+    from migrations import convert_json_to_jsonb
+
+    _fresh_schema()
+    convert_json_to_jsonb.upgrade()
+    convert_json_to_jsonb.upgrade()
+    print("✅ convert_json_to_jsonb applied and re-ran cleanly")
+
+
+def run_all_tests():
+    """Run all migration tests"""
+    print("=" * 60)
+    print("MIGRATION TESTS")
+    print("=" * 60)
+
+    failed = []
+    for test in (test_run_all_twice, test_convert_json_to_jsonb_twice):
+        try:
+            test()
+        except Exception as e:
+            print(f"❌ {test.__name__}: {str(e)}")
+            failed.append(test.__name__)
+
+    print("\n" + "=" * 60)
+    if failed:
+        print(f"❌ Failed: {', '.join(failed)}")
+    else:
+        print("✅ All migration tests passed")
+    print("=" * 60)
+    return not failed
+
+
+if __name__ == "__main__":
+    if not run_all_tests():
+        raise SystemExit(1)
@@ -40,6 +40,22 @@ def check_imports():
         print(f"❌ Error importing User model: {str(e)}")
         return False
 
+    try:
+        # Every model must register on the single Base in app.models.database,
+        # otherwise create_all/reflection runs per duplicate metadata
+        from app.models.database import Base
+        stray = [
+            mapper.class_.__name__ for mapper in Base.registry.mappers
+            if mapper.local_table.metadata is not Base.metadata
+        ]
+        if stray:
+            print(f"❌ Models registered outside the shared Base metadata: {', '.join(stray)}")
+            return False
+        print(f"✅ Single Base metadata with {len(Base.metadata.tables)} tables")
+    except Exception as e:
+        print(f"❌ Error checking Base metadata: {str(e)}")
+        return False
+
     try:
         from app.routes import auth
         print("✅ Auth routes module imported successfully")
@@ -62,10 +78,10 @@ def check_imports():
         return False
 
     try:
-        from jose import jwt
-        print("✅ Python-jose (JWT) imported successfully")
+        import jwt
+        print("✅ PyJWT imported successfully")
     except Exception as e:
-        print(f"❌ Error importing jose: {str(e)}")
+        print(f"❌ Error importing PyJWT: {str(e)}")
         return False
 
     return True
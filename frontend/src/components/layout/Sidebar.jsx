@@ -17,19 +17,19 @@ const Sidebar = ({ categoryId }) => {
 
   // Check if topics have learning_path metadata
   const hasLearningPaths = categoryTopics.some(
-    (topic) => topic.extra_metadata?.learning_path
+    (topic) => topic.learning_path
   );
 
   const groupedTopics = categoryTopics.reduce((acc, topic) => {
     // Use learning_path if available, otherwise fall back to difficulty
     const groupKey = hasLearningPaths
-      ? topic.extra_metadata?.learning_path || 'ungrouped'
+      ? topic.learning_path || 'ungrouped'
       : `diff_${topic.difficulty || 1}`;
 
     if (!acc[groupKey]) {
       acc[groupKey] = {
         topics: [],
-        sequence: topic.extra_metadata?.sequence_order || 999,
+        sequence: topic.sequence_order || 999,
         name: groupKey,
       };
     }
@@ -63,8 +63,8 @@ const Sidebar = ({ categoryId }) => {
   // Sort topics within each group by sequence_order
   sortedGroups.forEach(([_, group]) => {
     group.topics.sort((a, b) => {
-      const seqA = a.extra_metadata?.sequence_order || 999;
-      const seqB = b.extra_metadata?.sequence_order || 999;
+      const seqA = a.sequence_order || 999;
+      const seqB = b.sequence_order || 999;
       return seqA - seqB;
     });
   });
@@ -172,7 +172,7 @@ const Sidebar = ({ categoryId }) => {
                         const isCompleted = isTopicCompleted(topic.id);
                         const isActive = topic.id === activeTopicId;
                         // Check if prerequisites are met (for greying out)
-                        const prereqIds = topic.extra_metadata?.prerequisites_ids || [];
+                        const prereqIds = topic.prerequisites_ids || [];
                         const hasUnmetPrereqs = prereqIds.some(
                           (prereqId) => !isTopicCompleted(prereqId)
                         );